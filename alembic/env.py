@@ -1,4 +1,6 @@
 import asyncio
+import logging
+import re
 from logging.config import fileConfig
 
 from sqlalchemy import pool
@@ -10,7 +12,8 @@ from alembic import context
 # Import the Base and settings
 from app.database import Base
 from app.config import get_settings
-from app.models import User, Exercise  # Import all models
+from app.migrations import adopt_unknown_revision
+from app.models import User, Exercise, ChatMember, MonthlyExerciseCount, Lift, ExerciseSet, GroupDigest, ProcessedUpdate  # Import all models
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -29,6 +32,27 @@ target_metadata = Base.metadata
 settings = get_settings()
 config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
+# Search index objects are managed by hand (0006_exercise_search), not by autogenerate
+SEARCH_OBJECTS = {"search_vector", "ix_exercises_search"}
+
+# Monthly partitions of exercises are managed by app.services.partition_service (0009_exercise_partitions)
+PARTITION_TABLE = re.compile(r"^exercises_(y\d{4}m\d{2}|default)$")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if name in SEARCH_OBJECTS or (type_ == "table" and name.startswith("exercises_fts")):
+        return False
+    if type_ == "table" and reflected and PARTITION_TABLE.match(name):
+        return False
+    # Only SQLite has it: exercises is partitioned on Postgres
+    if (
+        type_ == "foreign_key_constraint" and not reflected
+        and object.referred_table.name == "exercises"
+        and context.get_context().dialect.name == "postgresql"
+    ):
+        return False
+    return True
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -46,6 +70,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -55,7 +80,18 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    # Databases stamped by the old autogenerated migration continue from 0001_baseline
+    adopted = adopt_unknown_revision(connection, context.script)
+    if adopted:
+        logging.getLogger("alembic.env").warning(
+            f"Unknown revision {adopted} with the baseline schema: stamped 0001_baseline"
+        )
+
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object
+    )
 
     with context.begin_transaction():
         context.run_migrations()
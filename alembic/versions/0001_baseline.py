@@ -0,0 +1,64 @@
+"""Baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+The original users and exercises tables. Each one is only created if it is
+missing, so databases created by the old autogenerated migration ("Initial
+tables") can be adopted (see README, "Migraciones").
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'users' not in tables:
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.Column('first_name', sa.String(length=255), nullable=True),
+        sa.Column('last_name', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+        op.create_index(op.f('ix_users_telegram_id'), 'users', ['telegram_id'], unique=True)
+
+    if 'exercises' not in tables:
+        op.create_table('exercises',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_exercises_day'), 'exercises', ['day'], unique=False)
+        op.create_index(op.f('ix_exercises_id'), 'exercises', ['id'], unique=False)
+        op.create_index(op.f('ix_exercises_user_id'), 'exercises', ['user_id'], unique=False)
+        op.create_index('ix_exercises_user_day', 'exercises', ['user_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_exercises_user_id'), table_name='exercises')
+    op.drop_index('ix_exercises_user_day', table_name='exercises')
+    op.drop_index(op.f('ix_exercises_id'), table_name='exercises')
+    op.drop_index(op.f('ix_exercises_day'), table_name='exercises')
+    op.drop_table('exercises')
+    op.drop_index(op.f('ix_users_telegram_id'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
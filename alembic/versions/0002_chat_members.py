@@ -0,0 +1,33 @@
+"""Group membership for chat-scoped stats
+
+Revision ID: 0002_chat_members
+Revises: 0001_baseline
+Create Date: 2026-10-18 00:00:01
+
+Members are recorded as they write in (or join) each group, so the table
+starts empty: group /stats lists members as they show up.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_chat_members'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The composite primary key (chat_id, user_id) is the per-chat index
+    op.create_table('chat_members',
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('chat_id', 'user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chat_members')
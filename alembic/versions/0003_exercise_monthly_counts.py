@@ -0,0 +1,42 @@
+"""Monthly exercise rollups per user
+
+Revision ID: 0003_exercise_monthly_counts
+Revises: 0002_chat_members
+Create Date: 2026-10-18 00:00:02
+
+One row per user and month, kept up to date by every insert. The rows
+of existing exercises are filled in here, the same way as
+`python -m app.manage rebuild-counts`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_exercise_monthly_counts'
+down_revision = '0002_chat_members'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('exercise_monthly_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'month')
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        month = "CAST(date_trunc('month', day) AS DATE)"
+    else:
+        month = "date(day, 'start of month')"
+    op.execute(
+        "INSERT INTO exercise_monthly_counts (user_id, month, count) "
+        f"SELECT user_id, {month}, count(id) FROM exercises GROUP BY user_id, {month}"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('exercise_monthly_counts')
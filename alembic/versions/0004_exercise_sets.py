@@ -0,0 +1,60 @@
+"""Lifts catalog and parsed exercise sets
+
+Revision ID: 0004_exercise_sets
+Revises: 0003_exercise_monthly_counts
+Create Date: 2026-10-18 00:00:03
+
+Sets are parsed from the descriptions at write time. Exercises logged
+before this revision are parsed with `python -m app.manage backfill-sets`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_exercise_sets'
+down_revision = '0003_exercise_monthly_counts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('lifts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('display_name', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_lifts_id'), 'lifts', ['id'], unique=False)
+
+    op.create_table('exercise_sets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('lift_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sets', sa.Integer(), nullable=True),
+    sa.Column('reps', sa.Integer(), nullable=True),
+    sa.Column('weight', sa.Float(), nullable=True),
+    sa.Column('duration_minutes', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['lift_id'], ['lifts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_exercise_sets_exercise_id'), 'exercise_sets', ['exercise_id'], unique=False)
+    op.create_index(op.f('ix_exercise_sets_id'), 'exercise_sets', ['id'], unique=False)
+    op.create_index('ix_exercise_sets_user_lift_day', 'exercise_sets', ['user_id', 'lift_id', 'day'], unique=False)
+    op.create_index('ix_exercise_sets_user_lift_weight', 'exercise_sets', ['user_id', 'lift_id', 'weight'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_exercise_sets_user_lift_weight', table_name='exercise_sets')
+    op.drop_index('ix_exercise_sets_user_lift_day', table_name='exercise_sets')
+    op.drop_index(op.f('ix_exercise_sets_id'), table_name='exercise_sets')
+    op.drop_index(op.f('ix_exercise_sets_exercise_id'), table_name='exercise_sets')
+    op.drop_table('exercise_sets')
+    op.drop_index(op.f('ix_lifts_id'), table_name='lifts')
+    op.drop_table('lifts')
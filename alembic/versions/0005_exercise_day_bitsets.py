@@ -0,0 +1,43 @@
+"""Bitset of trained days in the monthly rollups
+
+Revision ID: 0005_exercise_day_bitsets
+Revises: 0004_exercise_sets
+Create Date: 2026-10-18 00:00:04
+
+exercise_monthly_counts.days: bit d-1 is set when the user has at least one
+exercise on day d of the month. The bits of existing rows are computed here
+from exercises, the same way as `python -m app.manage rebuild-counts`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_exercise_day_bitsets'
+down_revision = '0004_exercise_sets'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('exercise_monthly_counts',
+        sa.Column('days', sa.Integer(), server_default='0', nullable=False))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        day_of_month = "CAST(extract(day FROM day) AS INTEGER)"
+        next_month = "exercise_monthly_counts.month + interval '1 month'"
+    else:
+        day_of_month = "CAST(strftime('%d', day) AS INTEGER)"
+        next_month = "date(exercise_monthly_counts.month, '+1 month')"
+    # Distinct powers of two summed = OR of the day bits
+    op.execute(
+        "UPDATE exercise_monthly_counts SET days = COALESCE(("
+        f"SELECT CAST(sum(DISTINCT 1 << ({day_of_month} - 1)) AS INTEGER) FROM exercises "
+        "WHERE exercises.user_id = exercise_monthly_counts.user_id "
+        f"AND exercises.day >= exercise_monthly_counts.month AND exercises.day < {next_month}"
+        "), 0)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('exercise_monthly_counts', 'days')
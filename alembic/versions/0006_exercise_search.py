@@ -0,0 +1,78 @@
+"""Full-text search over exercise descriptions
+
+Revision ID: 0006_exercise_search
+Revises: 0005_exercise_day_bitsets
+Create Date: 2026-10-18 00:00:05
+
+Postgres: generated tsvector column plus a GIN index on (user_id, search_vector)
+(btree_gin), so a search only touches the index entries of one user; if the
+btree_gin extension is not available the index covers search_vector only.
+SQLite: external-content FTS5 table kept in sync by triggers.
+The same DDL is attached to the Exercise model for metadata.create_all().
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_exercise_search'
+down_revision = '0005_exercise_day_bitsets'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Rewrites the table once to fill the column for existing rows
+        op.execute(
+            "ALTER TABLE exercises ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            # translate() strips accents like FTS5's remove_diacritics (unaccent is not immutable)
+            "GENERATED ALWAYS AS (to_tsvector('simple', translate(description, "
+            "'ÀÁÂÃÄÅÈÉÊËÌÍÎÏÒÓÔÕÖÙÚÛÜÑÇÝàáâãäåèéêëìíîïòóôõöùúûüñçýÿ', "
+            "'AAAAAAEEEEIIIIOOOOOUUUUNCYaaaaaaeeeeiiiiooooouuuuncyy'))) STORED"
+        )
+        # Without btree_gin (contrib) the planner combines a plain GIN with ix_exercises_user_id
+        op.execute("""
+DO $$ BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gin') THEN
+        CREATE EXTENSION IF NOT EXISTS btree_gin;
+        CREATE INDEX IF NOT EXISTS ix_exercises_search ON exercises USING gin (user_id, search_vector);
+    ELSE
+        CREATE INDEX IF NOT EXISTS ix_exercises_search ON exercises USING gin (search_vector);
+    END IF;
+END $$
+        """)
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS exercises_fts USING fts5("
+            "description, content='exercises', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS exercises_fts_ai AFTER INSERT ON exercises BEGIN "
+            "INSERT INTO exercises_fts(rowid, description) VALUES (new.id, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS exercises_fts_ad AFTER DELETE ON exercises BEGIN "
+            "INSERT INTO exercises_fts(exercises_fts, rowid, description) "
+            "VALUES ('delete', old.id, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS exercises_fts_au AFTER UPDATE OF description ON exercises BEGIN "
+            "INSERT INTO exercises_fts(exercises_fts, rowid, description) "
+            "VALUES ('delete', old.id, old.description); "
+            "INSERT INTO exercises_fts(rowid, description) VALUES (new.id, new.description); END"
+        )
+        # Index the rows that already exist
+        op.execute("INSERT INTO exercises_fts(exercises_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_exercises_search")
+        op.execute("ALTER TABLE exercises DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        for trigger in ('exercises_fts_ai', 'exercises_fts_ad', 'exercises_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS exercises_fts")
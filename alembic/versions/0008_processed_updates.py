@@ -0,0 +1,30 @@
+"""Processed Telegram update ids for deduplication
+
+Revision ID: 0008_processed_updates
+Revises: 0007_group_digests
+Create Date: 2026-10-18 00:00:07
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_processed_updates'
+down_revision = '0007_group_digests'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('processed_updates',
+    sa.Column('update_id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('update_id')
+    )
+    op.create_index(op.f('ix_processed_updates_received_at'), 'processed_updates', ['received_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_processed_updates_received_at'), table_name='processed_updates')
+    op.drop_table('processed_updates')
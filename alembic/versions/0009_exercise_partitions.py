@@ -0,0 +1,115 @@
+"""Monthly range partitions for exercises (Postgres)
+
+Revision ID: 0009_exercise_partitions
+Revises: 0008_processed_updates
+Create Date: 2026-10-18 00:00:08
+
+Postgres: exercises becomes a table partitioned by month of day, one
+partition per month with data plus the next MONTHS_AHEAD months
+(exercises_y2024m01, ...) and a DEFAULT partition for any other day, so
+date-bounded queries only scan the months they ask for. The primary key
+becomes (id, day); ids keep coming from exercises_id_seq. The search column
+and the indexes are recreated on the parent, so every partition gets them.
+Rows are copied once while exercises is locked.
+exercise_sets.exercise_id stops being a foreign key: a key referencing a
+partitioned table must include day, and it would block detaching archived
+months whose sets still serve /pr and /progress.
+Later partitions are created and archived by app.services.partition_service.
+SQLite stays unpartitioned.
+"""
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_exercise_partitions'
+down_revision = '0008_processed_updates'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, user_id, day, description, created_at"
+
+
+def _create_indexes() -> None:
+    op.create_index(op.f('ix_exercises_day'), 'exercises', ['day'], unique=False)
+    op.create_index(op.f('ix_exercises_id'), 'exercises', ['id'], unique=False)
+    op.create_index(op.f('ix_exercises_user_id'), 'exercises', ['user_id'], unique=False)
+    op.create_index('ix_exercises_user_day', 'exercises', ['user_id', 'day'], unique=False)
+    # Same as 0006_exercise_search
+    op.execute("""
+DO $$ BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gin') THEN
+        CREATE EXTENSION IF NOT EXISTS btree_gin;
+        CREATE INDEX IF NOT EXISTS ix_exercises_search ON exercises USING gin (user_id, search_vector);
+    ELSE
+        CREATE INDEX IF NOT EXISTS ix_exercises_search ON exercises USING gin (search_vector);
+    END IF;
+END $$
+    """)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE exercise_sets DROP CONSTRAINT IF EXISTS exercise_sets_exercise_id_fkey")
+    op.execute("LOCK TABLE exercises IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER TABLE exercises RENAME TO exercises_unpartitioned")
+    # Keeps the id default (exercises_id_seq) and the generated search_vector column
+    op.execute(
+        "CREATE TABLE exercises (LIKE exercises_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED) "
+        "PARTITION BY RANGE (day)"
+    )
+
+    # Months with data and the upcoming ones; the gaps fall into the default partition
+    current = date.today().replace(day=1)
+    months = set(bind.execute(sa.text(
+        "SELECT DISTINCT date_trunc('month', day)::date FROM exercises_unpartitioned"
+    )).scalars())
+    months.update(current + relativedelta(months=offset) for offset in range(MONTHS_AHEAD + 1))
+    for month in sorted(months):
+        end = month + relativedelta(months=1)
+        op.execute(
+            f"CREATE TABLE exercises_y{month.year}m{month.month:02d} PARTITION OF exercises "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    op.execute("CREATE TABLE exercises_default PARTITION OF exercises DEFAULT")
+
+    op.execute(f"INSERT INTO exercises ({COLUMNS}) SELECT {COLUMNS} FROM exercises_unpartitioned")
+    op.execute("ALTER SEQUENCE exercises_id_seq OWNED BY exercises.id")
+    op.execute("DROP TABLE exercises_unpartitioned")
+
+    # Built after the copy, on the parent and every partition
+    op.execute("ALTER TABLE exercises ADD PRIMARY KEY (id, day)")
+    op.create_foreign_key(None, 'exercises', 'users', ['user_id'], ['id'])
+    _create_indexes()
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Partitions moved to the archive schema are still attached and come back;
+    # detached ones must be attached again first, or the foreign key below fails
+    op.execute("LOCK TABLE exercises IN ACCESS EXCLUSIVE MODE")
+    op.execute(
+        "CREATE TABLE exercises_unpartitioned "
+        "(LIKE exercises INCLUDING DEFAULTS INCLUDING GENERATED)"
+    )
+    op.execute(f"INSERT INTO exercises_unpartitioned ({COLUMNS}) SELECT {COLUMNS} FROM exercises")
+    op.execute("ALTER SEQUENCE exercises_id_seq OWNED BY exercises_unpartitioned.id")
+    op.execute("DROP TABLE exercises")
+    op.execute("ALTER TABLE exercises_unpartitioned RENAME TO exercises")
+
+    op.execute("ALTER TABLE exercises ADD PRIMARY KEY (id)")
+    op.create_foreign_key(None, 'exercises', 'users', ['user_id'], ['id'])
+    _create_indexes()
+    op.create_foreign_key(None, 'exercise_sets', 'exercises', ['exercise_id'], ['id'], ondelete='CASCADE')
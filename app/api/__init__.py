@@ -0,0 +1,3 @@
+from app.api.exercises import router
+
+__all__ = ["router"]
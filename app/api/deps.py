@@ -0,0 +1,15 @@
+import secrets
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.config import get_settings
+
+bearer = HTTPBearer(auto_error=False)
+
+
+async def require_api_key(credentials: HTTPAuthorizationCredentials | None = Depends(bearer)):
+    """Require 'Authorization: Bearer <API_KEY>' (API disabled when API_KEY is not set)"""
+    api_key = get_settings().API_KEY
+    if not api_key:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="API disabled")
+    if credentials is None or not secrets.compare_digest(credentials.credentials, api_key):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key")
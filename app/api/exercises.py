@@ -0,0 +1,121 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.api.deps import require_api_key
+from app.config import get_settings
+from app.database import AsyncSessionLocal, read_session
+from app.services import import_service, export_service, user_service, search_service
+
+router = APIRouter(prefix="/api/v1", dependencies=[Depends(require_api_key)])
+
+
+@router.post("/exercises/import")
+async def import_exercises(
+    request: Request,
+    telegram_id: int,
+    format: Literal["csv", "json"] = "csv"
+):
+    """Bulk import exercises from a streamed CSV (day,description) or JSON/JSON Lines body"""
+    if format == "csv":
+        records = import_service.iter_csv_records(request.stream())
+    else:
+        records = import_service.iter_json_records(request.stream())
+
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await import_service.import_exercises(
+                db=db,
+                telegram_id=telegram_id,
+                records=records,
+                chunk_size=get_settings().IMPORT_CHUNK_SIZE
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    body = {
+        "inserted": result.inserted,
+        "rejected": result.rejected,
+        "errors": result.errors
+    }
+    if result.error:
+        # The rows counted in inserted are already committed: a retry must skip them
+        raise HTTPException(status_code=400, detail={"error": result.error, **body})
+    return body
+
+
+@router.get("/exercises/export")
+async def export_exercises(
+    telegram_id: int | None = None,
+    chat_id: int | None = None,
+    format: Literal["csv", "json"] = "csv"
+):
+    """Stream a user's (or group's) exercises as CSV or JSON Lines"""
+    if (telegram_id is None) == (chat_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of telegram_id or chat_id")
+
+    # Fail before streaming starts if the user does not exist
+    if telegram_id is not None:
+        async with read_session(telegram_id) as db:
+            if await user_service.resolve_user_id(db, telegram_id) is None:
+                raise HTTPException(status_code=404, detail=f"User with telegram_id {telegram_id} not found")
+
+    settings = get_settings()
+
+    # The session lives inside the generator so it stays open while streaming
+    async def body():
+        async with read_session(telegram_id) as db:
+            async for chunk in export_service.export_bytes(
+                db=db,
+                fmt=format,
+                telegram_id=telegram_id,
+                chat_id=chat_id,
+                batch_size=settings.EXPORT_BATCH_SIZE
+            ):
+                yield chunk
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    extension = "csv" if format == "csv" else "jsonl"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="gymbot_export.{extension}"'}
+    )
+
+
+@router.get("/exercises/search")
+async def search_exercises(
+    q: str,
+    telegram_id: int | None = None,
+    chat_id: int | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None
+):
+    """Full-text search over a user's (or group's) exercises, best match first.
+
+    Pass next_cursor from the previous response as cursor to get the next page.
+    """
+    if (telegram_id is None) == (chat_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of telegram_id or chat_id")
+
+    after = None
+    if cursor is not None:
+        try:
+            rank, exercise_id = cursor.rsplit(":", 1)
+            after = (float(rank), int(exercise_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    async with read_session(telegram_id) as db:
+        rows, has_more = await search_service.search_exercises(
+            db=db,
+            query=q,
+            telegram_id=telegram_id,
+            chat_id=chat_id,
+            after=after,
+            limit=limit
+        )
+
+    return {
+        "results": [row._asdict() for row in rows],
+        "next_cursor": f"{rows[-1].rank!r}:{rows[-1].id}" if has_more else None
+    }
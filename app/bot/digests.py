@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from telegram import Bot
+from telegram.error import NetworkError, RetryAfter, TelegramError, TimedOut
+from app.bot.rate_limiter import PRIORITY_BULK, TokenBucket
+from app.bot.utils import format_digest
+from app.database import engine, AsyncSessionLocal, try_advisory_lock
+from app.metrics import GROUP_DIGESTS
+from app.services import exercise_service, digest_service
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock de Postgres: un solo proceso publica resúmenes a la vez
+DIGEST_LOCK_ID = 0x67796D646967  # "gymdig"
+
+
+class DigestScheduler:
+    """Posts weekly and monthly leaderboards to every group the bot knows.
+
+    Every check_interval seconds, each digest kind whose period has closed
+    (and whose publish hour has passed) is sent to the groups that don't
+    have it yet, batch_size groups at a time: the batch is claimed in
+    group_digests, all its leaderboards come from one query, and the
+    messages go out through the bot's rate limiter at bulk priority.
+    Claims are committed before sending, so a restart never posts twice.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        kinds: list[str],
+        hour: int = 9,
+        check_interval: float = 300.0,
+        batch_size: int = 500,
+        top: int = 10,
+        fallback_rate: float = 30.0
+    ):
+        unknown = set(kinds) - set(digest_service.DIGEST_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown digest kinds: {', '.join(sorted(unknown))}")
+        self.bot = bot
+        self.kinds = kinds
+        self.hour = hour
+        self.check_interval = check_interval
+        self.batch_size = max(1, batch_size)
+        self.top = top
+        # Without the bot's rate limiter, throttle digests on our own
+        self._bucket = None if getattr(bot, "rate_limiter", None) else TokenBucket(fallback_rate, 1)
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Check for due digests periodically in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="digest-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Group digest run failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    async def run_due(self, now: datetime | None = None) -> dict[str, int]:
+        """Send every digest that is due; returns messages sent per kind"""
+        now = now or datetime.now()
+        due = []
+        for kind in self.kinds:
+            start_date, end_date = digest_service.digest_period(kind, now.date())
+            # Published from DIGEST_HOUR of the day after the period ends
+            if now >= datetime.combine(end_date + timedelta(days=1), time(self.hour)):
+                due.append((kind, start_date, end_date))
+        if not due:
+            return {}
+
+        if engine.dialect.name != "postgresql":
+            return {kind: await self._run(kind, start, end) for kind, start, end in due}
+
+        # Other workers skip this round instead of waiting
+        async with try_advisory_lock(DIGEST_LOCK_ID) as conn:
+            if conn is None:
+                return {}
+            return {kind: await self._run(kind, start, end) for kind, start, end in due}
+
+    async def _run(self, kind: str, start_date: date, end_date: date) -> int:
+        sent = 0
+        after = None
+        while True:
+            async with AsyncSessionLocal() as db:
+                chat_ids = await digest_service.pending_chats(
+                    db, kind, start_date, after_chat_id=after, limit=self.batch_size
+                )
+                if not chat_ids:
+                    break
+                after = chat_ids[-1]
+                claimed = await digest_service.claim_digests(db, kind, start_date, chat_ids)
+                leaderboards = await exercise_service.get_group_leaderboards(
+                    db, claimed, start_date, end_date
+                )
+
+            messages = {
+                chat_id: format_digest(kind, start_date, end_date, leaderboard, self.top)
+                for chat_id, leaderboard in leaderboards.items()
+                if leaderboard
+            }
+            outcomes = await asyncio.gather(*(
+                self._send(kind, chat_id, text) for chat_id, text in messages.items()
+            ))
+            # Groups where nobody trained get no (empty) digest
+            results = {chat_id: ("skipped", None) for chat_id in claimed}
+            results.update(zip(messages, outcomes))
+
+            async with AsyncSessionLocal() as db:
+                await digest_service.finish_digests(db, kind, start_date, results)
+
+            for status, _ in results.values():
+                GROUP_DIGESTS.labels(kind=kind, status=status).inc()
+            sent += sum(status == "sent" for status, _ in results.values())
+
+        if sent:
+            logger.info(f"Sent {sent} {kind} group digests for {start_date}..{end_date}")
+        return sent
+
+    async def _send(self, kind: str, chat_id: int, text: str) -> tuple[str, str | None]:
+        try:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+                await self.bot.send_message(chat_id=chat_id, text=text)
+            else:
+                await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    rate_limit_args={"priority": PRIORITY_BULK}
+                )
+            return "sent", None
+        except (RetryAfter, NetworkError) as e:
+            if isinstance(e, TimedOut):
+                # The message may have been delivered: don't risk posting twice
+                logger.warning(f"{kind} digest to chat {chat_id} timed out: {e}")
+                return "failed", str(e)
+            logger.warning(f"{kind} digest to chat {chat_id} not sent, will retry: {e}")
+            return "retry", str(e)
+        except TelegramError as e:
+            # Bot removed from the group, chat migrated, etc.
+            logger.warning(f"{kind} digest to chat {chat_id} failed: {e}")
+            return "failed", str(e)
+
+
+def digest_scheduler_from_settings(bot: Bot, settings) -> DigestScheduler:
+    return DigestScheduler(
+        bot,
+        kinds=[kind.strip() for kind in settings.DIGEST_KINDS.split(",") if kind.strip()],
+        hour=settings.DIGEST_HOUR,
+        check_interval=settings.DIGEST_CHECK_INTERVAL,
+        batch_size=settings.DIGEST_BATCH_SIZE,
+        top=settings.DIGEST_TOP,
+        fallback_rate=settings.TELEGRAM_GLOBAL_RATE / max(1, settings.WORKERS)
+    )
@@ -1,10 +1,42 @@
+import httpx
 from telegram import Update
 from telegram.ext import ContextTypes
 from datetime import date
 from dateutil.relativedelta import relativedelta
-from app.services import user_service, exercise_service
-from app.database import AsyncSessionLocal
-from app.bot.utils import parse_date, parse_month, format_exercise_list
+from app.config import get_settings
+from app.services import (
+    user_service,
+    exercise_service,
+    chat_service,
+    import_service,
+    export_service,
+    workout_service,
+    search_service,
+    partition_service
+)
+from app.services.stats_cache import stats_cache, user_scope
+from app.services.write_batcher import exercise_batcher
+from app.database import AsyncSessionLocal, read_session
+from app.metrics import HANDLER_ERRORS
+from app.bot.utils import (
+    parse_date,
+    parse_month,
+    month_range,
+    format_exercise_list,
+    format_calendar,
+    format_set,
+    build_history_keyboard,
+    parse_history_callback,
+    format_search_results,
+    parse_search_terms,
+    build_search_keyboard,
+    parse_search_callback
+)
+
+# Entrenamientos por página en /history
+HISTORY_PAGE_SIZE = 10
+# Resultados por página en /search
+SEARCH_PAGE_SIZE = 10
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -21,6 +53,10 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             last_name=user.last_name
         )
 
+        # Si se registra desde un grupo, queda como miembro de inmediato
+        if update.effective_chat.type in ["group", "supergroup"]:
+            await chat_service.add_member(db, update.effective_chat.id, user.id)
+
     await update.message.reply_text(
         "¡Bienvenido a GymBot! 🏋️\n\n"
         "Te ayudaré a llevar el control de tus entrenamientos.\n\n"
@@ -31,6 +67,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/stats - Ver estadísticas del mes\n"
         "/stats_month <YYYY-MM> - Ver estadísticas de un mes\n"
         "/stats_custom <inicio> <fin> - Ver estadísticas personalizadas\n"
+        "/history - Ver tu historial completo\n"
+        "/search <términos> - Buscar entrenamientos\n"
+        "/export - Exportar tu historial\n"
         "/help - Ver todos los comandos"
     )
 
@@ -50,11 +89,37 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "   Ejemplo: /stats_month 2025-12\n\n"
         "/stats_custom <inicio> <fin> - Ver estadísticas de rango personalizado\n"
         "   Ejemplo: /stats_custom 2026-01-01 2026-01-15\n\n"
+        "/streak - Ver tu racha actual y la más larga\n\n"
+        "/calendar <YYYY-MM> - Ver los días entrenados del mes (por defecto el actual)\n\n"
+        "/history - Ver todo tu historial, página por página\n\n"
+        "/search <términos> - Buscar entrenamientos pasados (en grupos, los del grupo)\n"
+        "   Ejemplo: /search deadlift\n\n"
+        "/pr - Ver tu mejor marca en cada ejercicio\n\n"
+        "/progress <ejercicio> - Ver la evolución de un ejercicio\n"
+        "   Ejemplo: /progress bench press\n\n"
+        "/export <csv|json> - Exportar todo el historial (en grupos, el del grupo)\n"
+        "   Ejemplo: /export csv\n\n"
+        "Importar historial: envía un archivo .csv (columnas day,description) "
+        "o .json con tus entrenamientos pasados\n\n"
         "/help - Mostrar esta ayuda",
         parse_mode="Markdown"
     )
 
 
+async def _record_exercise(db, telegram_id: int, day: date, description: str) -> int:
+    """Add an exercise (batched if enabled) and return the user's training days in its month"""
+    if exercise_batcher:
+        _, total = await exercise_batcher.add(telegram_id, day, description)
+    else:
+        _, total = await exercise_service.add_exercise_and_count(
+            db=db,
+            telegram_id=telegram_id,
+            day=day,
+            description=description
+        )
+    return total
+
+
 async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /add command - Add exercise for today"""
     if not context.args:
@@ -70,28 +135,13 @@ async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     async with AsyncSessionLocal() as db:
         try:
-            # Add exercise
-            await exercise_service.add_exercise(
-                db=db,
-                telegram_id=telegram_id,
-                day=today,
-                description=description
-            )
-
-            # Get count for current month
-            month_start = today.replace(day=1)
-            counts = await exercise_service.count_exercises(
-                db=db,
-                telegram_id=telegram_id,
-                start_date=month_start,
-                end_date=today
-            )
-            total = counts[0].count if counts else 0
+            # Add exercise and get the days trained that month in one round trip
+            total = await _record_exercise(db, telegram_id, today, description)
 
             await update.message.reply_text(
                 f"✅ Entrenamiento registrado para {today}\n\n"
                 f"Descripción: {description}\n"
-                f"Total de entrenamientos este mes: {total}"
+                f"Total de entrenamientos este mes: {total} días"
             )
         except ValueError as e:
             await update.message.reply_text(
@@ -135,28 +185,13 @@ async def add_past_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     async with AsyncSessionLocal() as db:
         try:
-            # Add exercise
-            await exercise_service.add_exercise(
-                db=db,
-                telegram_id=telegram_id,
-                day=exercise_date,
-                description=description
-            )
-
-            # Get count for the month of the exercise
-            month_start = exercise_date.replace(day=1)
-            counts = await exercise_service.count_exercises(
-                db=db,
-                telegram_id=telegram_id,
-                start_date=month_start,
-                end_date=exercise_date
-            )
-            total = counts[0].count if counts else 0
+            # Add exercise and get the days trained that month in one round trip
+            total = await _record_exercise(db, telegram_id, exercise_date, description)
 
             await update.message.reply_text(
                 f"✅ Entrenamiento registrado para {exercise_date}\n\n"
                 f"Descripción: {description}\n"
-                f"Total de entrenamientos en {exercise_date.strftime('%B %Y')}: {total}"
+                f"Total de entrenamientos en {exercise_date.strftime('%B %Y')}: {total} días"
             )
         except ValueError as e:
             await update.message.reply_text(
@@ -170,40 +205,26 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_id = update.effective_user.id
     chat_type = update.effective_chat.type
     today = date.today()
-    month_start = today.replace(day=1)
+    month_start, _ = month_range(today)
 
-    async with AsyncSessionLocal() as db:
+    # Solo lecturas: van a la réplica si está configurada
+    async with read_session(telegram_id) as db:
         # Detectar si es un grupo
         if chat_type in ["group", "supergroup"]:
-            # En grupos: mostrar stats de todos los usuarios
-            # Obtener todos los ejercicios del grupo en el mes
-            all_exercises = await exercise_service.get_exercises_by_date_range(
+            # En grupos: ranking de usuarios calculado en la base de datos
+            leaderboard = await exercise_service.get_leaderboard(
                 db=db,
                 start_date=month_start,
-                end_date=today
+                end_date=today,
+                chat_id=update.effective_chat.id
             )
 
-            # Agrupar por usuario
-            user_stats = {}
-            for exercise in all_exercises:
-                user_id = exercise.user_id
-                if user_id not in user_stats:
-                    user = await user_service.get_user_by_id(db, user_id)
-                    user_stats[user_id] = {
-                        "user": user,
-                        "count": 0
-                    }
-                user_stats[user_id]["count"] += 1
-
             # Formatear mensaje para grupo
             month_name = today.strftime("%B %Y")
             message = f"📊 Estadísticas del Grupo - {month_name}\n\n"
 
-            if user_stats:
-                for user_id, stats in sorted(user_stats.items(), key=lambda x: x[1]["count"], reverse=True):
-                    user = stats["user"]
-                    count = stats["count"]
-                    name = user.first_name or user.username or f"User {user_id}"
+            if leaderboard:
+                for name, count in leaderboard:
                     message += f"• {name}: {count} días\n"
             else:
                 message += "No hay entrenamientos registrados este mes."
@@ -211,15 +232,8 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             message += "\n\n¡Sigan así! 💪"
 
         else:
-            # Chat privado: mostrar stats personales (código existente)
-            counts = await exercise_service.count_exercises(
-                db=db,
-                telegram_id=telegram_id,
-                start_date=month_start,
-                end_date=today
-            )
-
-            total = counts[0].count if counts else 0
+            # Chat privado: mostrar stats personales (días y ejercicios salen del rollup del mes)
+            total, exercises = await exercise_service.get_month_totals(db, telegram_id, month_start)
 
             # Get recent exercises
             recent_exercises = await exercise_service.get_recent_exercises(
@@ -231,7 +245,8 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # Format message
             month_name = today.strftime("%B %Y")
             message = f"📊 Tus Estadísticas - {month_name}\n\n"
-            message += f"Total de entrenamientos: {total} días\n\n"
+            message += f"Total de entrenamientos: {total} días\n"
+            message += f"Ejercicios registrados: {exercises}\n\n"
 
             if recent_exercises:
                 message += "Últimos entrenamientos:\n"
@@ -268,24 +283,23 @@ async def stats_month_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     start_date, end_date = date_range
     telegram_id = update.effective_user.id
 
-    async with AsyncSessionLocal() as db:
-        # Get count
-        counts = await exercise_service.count_exercises(
-            db=db,
-            telegram_id=telegram_id,
-            start_date=start_date,
-            end_date=end_date
-        )
-
-        total = counts[0].count if counts else 0
+    async def render() -> str:
+        async with read_session(telegram_id) as db:
+            total, exercises = await exercise_service.get_month_totals(db, telegram_id, start_date)
 
         # Format message
         month_name = start_date.strftime("%B %Y")
         message = f"📊 Tus Estadísticas - {month_name}\n\n"
-        message += f"Total de entrenamientos: {total} días\n\n"
+        message += f"Total de entrenamientos: {total} días\n"
+        message += f"Ejercicios registrados: {exercises}\n\n"
         message += f"Período: {start_date} a {end_date}"
+        return message
 
-        await update.message.reply_text(message)
+    # Cached until an exercise is written inside the month
+    message = await stats_cache.get_or_render(
+        user_scope(telegram_id), start_date, end_date, render
+    )
+    await update.message.reply_text(message)
 
 
 async def stats_custom_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -320,23 +334,393 @@ async def stats_custom_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
     telegram_id = update.effective_user.id
 
-    async with AsyncSessionLocal() as db:
-        # Get count
-        counts = await exercise_service.count_exercises(
-            db=db,
-            telegram_id=telegram_id,
-            start_date=start_date,
-            end_date=end_date
-        )
-
-        total = counts[0].count if counts else 0
+    async def render() -> str:
+        async with read_session(telegram_id) as db:
+            total = await exercise_service.count_training_days(
+                db=db,
+                telegram_id=telegram_id,
+                start_date=start_date,
+                end_date=end_date
+            )
 
         # Format message
         message = f"📊 Tus Estadísticas\n\n"
         message += f"Total de entrenamientos: {total} días\n\n"
         message += f"Período: {start_date} a {end_date}"
+        return message
+
+    # Cached until an exercise is written inside the range
+    message = await stats_cache.get_or_render(
+        user_scope(telegram_id), start_date, end_date, render
+    )
+    await update.message.reply_text(message)
+
+
+async def streak_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /streak command - Show current and longest streak of training days"""
+    telegram_id = update.effective_user.id
+
+    async with read_session(telegram_id) as db:
+        current, longest = await exercise_service.get_streaks(db, telegram_id, date.today())
+
+    message = "🔥 Tus Rachas\n\n"
+    message += f"Racha actual: {current} días seguidos\n"
+    message += f"Racha más larga: {longest} días seguidos"
+    if current == 0:
+        message += "\n\n¡Registra un entrenamiento hoy para empezar una nueva racha! 💪"
+    await update.message.reply_text(message)
+
+
+async def calendar_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /calendar command - Show a month heatmap of training days"""
+    if context.args:
+        date_range = parse_month(context.args[0])
+        if not date_range:
+            await update.message.reply_text(
+                "❌ Formato de mes inválido.\n\n"
+                "Uso: /calendar <YYYY-MM>\n"
+                "Ejemplo: /calendar 2025-12"
+            )
+            return
+    else:
+        date_range = month_range(date.today())
+
+    start_date, end_date = date_range
+    telegram_id = update.effective_user.id
+
+    async with read_session(telegram_id) as db:
+        trained = await exercise_service.get_training_days(db, telegram_id, start_date, end_date)
+
+    message = f"📅 {start_date.strftime('%B %Y')}\n\n"
+    message += format_calendar(start_date, trained)
+    message += f"\n\n{len(trained)} días entrenados"
+    await update.message.reply_text(message)
+
+
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /history command - Browse all past exercises, newest first"""
+    telegram_id = update.effective_user.id
+
+    async with read_session(telegram_id) as db:
+        exercises, has_older, has_newer = await exercise_service.get_exercise_page(
+            db=db,
+            telegram_id=telegram_id,
+            limit=HISTORY_PAGE_SIZE
+        )
+        note = await _archived_note(db)
+
+    if not exercises:
+        await update.message.reply_text("No hay entrenamientos registrados." + note)
+        return
+
+    await update.message.reply_text(
+        _format_history(exercises) + note,
+        reply_markup=build_history_keyboard(telegram_id, exercises, has_older, has_newer)
+    )
+
+
+async def history_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /history paging buttons - Edit the message in place with the next page"""
+    query = update.callback_query
+    parsed = parse_history_callback(query.data)
+    if not parsed:
+        await query.answer()
+        return
+
+    direction, telegram_id, day, exercise_id = parsed
+    if query.from_user.id != telegram_id:
+        await query.answer("Solo puedes navegar tu propio historial.")
+        return
+
+    cursor = (day, exercise_id)
+    async with read_session(telegram_id) as db:
+        exercises, has_older, has_newer = await exercise_service.get_exercise_page(
+            db=db,
+            telegram_id=telegram_id,
+            before=cursor if direction == "o" else None,
+            after=cursor if direction == "n" else None,
+            limit=HISTORY_PAGE_SIZE
+        )
+
+    await query.answer()
+    if not exercises:
+        return
+
+    await query.edit_message_text(
+        _format_history(exercises),
+        reply_markup=build_history_keyboard(telegram_id, exercises, has_older, has_newer)
+    )
+
+
+async def _archived_note(db) -> str:
+    """Notice for commands that read exercises: months detached by PARTITION_ARCHIVE_MODE=detach are missing"""
+    settings = get_settings()
+    if settings.PARTITION_ARCHIVE_MODE != "detach":
+        return ""
+    until = await partition_service.detached_until(db, settings.PARTITION_ARCHIVE_SCHEMA)
+    if until is None:
+        return ""
+    return f"\n\nℹ️ Los entrenamientos anteriores a {until:%Y-%m} están archivados y no aparecen aquí."
+
 
+def _format_history(exercises) -> str:
+    return (
+        f"📜 Historial ({exercises[-1].day} a {exercises[0].day})\n\n"
+        + format_exercise_list(exercises)
+    )
+
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /search command - Find past exercises by text (in groups, the group's)"""
+    if not context.args:
+        await update.message.reply_text(
+            "❌ Formato incorrecto.\n\n"
+            "Uso: /search <términos>\n"
+            "Ejemplo: /search deadlift"
+        )
+        return
+
+    terms = " ".join(context.args)
+    if update.effective_chat.type in ["group", "supergroup"]:
+        scope, scope_id = "c", update.effective_chat.id
+    else:
+        scope, scope_id = "u", update.effective_user.id
+
+    async with read_session(update.effective_user.id) as db:
+        rows, has_more = await search_service.search_exercises(
+            db=db,
+            query=terms,
+            telegram_id=scope_id if scope == "u" else None,
+            chat_id=scope_id if scope == "c" else None,
+            limit=SEARCH_PAGE_SIZE
+        )
+        note = await _archived_note(db)
+
+    if not rows:
+        await update.message.reply_text(f"No encontré entrenamientos con '{terms}'." + note)
+        return
+
+    await update.message.reply_text(
+        format_search_results(terms, rows) + note,
+        reply_markup=build_search_keyboard(scope, scope_id, rows, has_more)
+    )
+
+
+async def search_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /search paging button - Edit the message in place with the next results"""
+    query = update.callback_query
+    parsed = parse_search_callback(query.data)
+    terms = parse_search_terms(query.message.text or "") if query.message else None
+    if not parsed or not terms:
+        await query.answer()
+        return
+
+    scope, scope_id, rank, exercise_id = parsed
+    if scope == "u" and query.from_user.id != scope_id:
+        await query.answer("Solo puedes navegar tus propias búsquedas.")
+        return
+    if scope == "c" and query.message.chat.id != scope_id:
+        await query.answer()
+        return
+
+    async with read_session(query.from_user.id) as db:
+        rows, has_more = await search_service.search_exercises(
+            db=db,
+            query=terms,
+            telegram_id=scope_id if scope == "u" else None,
+            chat_id=scope_id if scope == "c" else None,
+            after=(rank, exercise_id),
+            limit=SEARCH_PAGE_SIZE
+        )
+
+    await query.answer()
+    if not rows:
+        return
+
+    await query.edit_message_text(
+        format_search_results(terms, rows),
+        reply_markup=build_search_keyboard(scope, scope_id, rows, has_more)
+    )
+
+
+async def pr_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /pr command - Show the best set of every lift"""
+    telegram_id = update.effective_user.id
+
+    async with read_session(telegram_id) as db:
+        records = await workout_service.get_personal_records(db, telegram_id)
+
+    if not records:
+        await update.message.reply_text(
+            "No hay ejercicios con series o peso registrados.\n\n"
+            "Ejemplo: /add Bench press 3x10 80kg"
+        )
+        return
+
+    message = "🏆 Tus Mejores Marcas\n\n"
+    for record in records:
+        message += (
+            f"• {record.name}: "
+            f"{format_set(record.sets, record.reps, record.weight, record.duration_minutes)}"
+            f" ({record.day})\n"
+        )
+    await update.message.reply_text(message)
+
+
+async def progress_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /progress command - Show the latest sets of one lift"""
+    if not context.args:
+        await update.message.reply_text(
+            "❌ Formato incorrecto.\n\n"
+            "Uso: /progress <ejercicio>\n"
+            "Ejemplo: /progress bench press"
+        )
+        return
+
+    telegram_id = update.effective_user.id
+    name = " ".join(context.args)
+
+    async with read_session(telegram_id) as db:
+        lifts = await workout_service.find_lifts(db, telegram_id, name)
+        if len(lifts) == 1:
+            progress = await workout_service.get_progress(db, telegram_id, lifts[0].id)
+        elif not lifts:
+            known = await workout_service.get_user_lifts(db, telegram_id)
+
+    if not lifts:
+        message = f"❌ No encontré registros de '{name}'."
+        if known:
+            message += "\n\nTus ejercicios: " + ", ".join(known)
         await update.message.reply_text(message)
+        return
+
+    if len(lifts) > 1:
+        await update.message.reply_text(
+            "¿Cuál de estos?\n\n" + "\n".join(f"• /progress {lift.display_name}" for lift in lifts)
+        )
+        return
+
+    message = f"📈 Progreso - {lifts[0].display_name}\n\n"
+    for entry in progress:
+        message += (
+            f"• {entry.day}: "
+            f"{format_set(entry.sets, entry.reps, entry.weight, entry.duration_minutes)}\n"
+        )
+    await update.message.reply_text(message)
+
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /export command - Send full history (user or group) as CSV/JSON files"""
+    fmt = context.args[0].lower() if context.args else "csv"
+    if fmt not in export_service.EXPORT_FORMATS:
+        await update.message.reply_text(
+            "❌ Formato incorrecto.\n\n"
+            "Uso: /export [csv|json]\n"
+            "Ejemplo: /export csv"
+        )
+        return
+
+    settings = get_settings()
+    is_group = update.effective_chat.type in ["group", "supergroup"]
+    extension = "csv" if fmt == "csv" else "jsonl"
+
+    async with read_session(update.effective_user.id) as db:
+        try:
+            # Se envía en partes de EXPORT_FILE_MAX_ROWS filas para acotar memoria
+            parts = 0
+            async for content in export_service.export_files(
+                db=db,
+                fmt=fmt,
+                telegram_id=None if is_group else update.effective_user.id,
+                chat_id=update.effective_chat.id if is_group else None,
+                batch_size=settings.EXPORT_BATCH_SIZE,
+                max_rows=settings.EXPORT_FILE_MAX_ROWS
+            ):
+                parts += 1
+                await update.message.reply_document(
+                    document=content,
+                    filename=f"gymbot_export_{parts}.{extension}"
+                )
+        except ValueError as e:
+            await update.message.reply_text(
+                f"❌ Error: {str(e)}\n\n"
+                "Primero usa /start para registrarte."
+            )
+            return
+        note = await _archived_note(db)
+
+    if not parts:
+        await update.message.reply_text("No hay entrenamientos registrados para exportar." + note)
+    elif note:
+        await update.message.reply_text(note.strip())
+
+
+async def import_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle uploaded CSV/JSON files - Bulk import past exercises"""
+    document = update.message.document
+    telegram_id = update.effective_user.id
+    file = await document.get_file()
+
+    await update.message.reply_text("⏳ Importando entrenamientos...")
+
+    async with httpx.AsyncClient() as client, AsyncSessionLocal() as db:
+        # Descargar el archivo como stream, sin cargarlo completo en memoria
+        async with client.stream("GET", file.file_path) as response:
+            response.raise_for_status()
+            if document.file_name.lower().endswith(".csv"):
+                records = import_service.iter_csv_records(response.aiter_bytes())
+            else:
+                records = import_service.iter_json_records(response.aiter_bytes())
+
+            try:
+                result = await import_service.import_exercises(
+                    db=db,
+                    telegram_id=telegram_id,
+                    records=records,
+                    chunk_size=get_settings().IMPORT_CHUNK_SIZE
+                )
+            except ValueError as e:
+                await update.message.reply_text(f"❌ Error: {str(e)}")
+                return
+
+    if result.error:
+        message = (
+            f"⚠️ Importación interrumpida: {result.error}\n\n"
+            f"Registros importados: {result.inserted}\n"
+            f"Registros rechazados: {result.rejected}\n\n"
+            "Los registros importados ya quedaron guardados: vuelve a subir solo los que faltan."
+        )
+    else:
+        message = (
+            "✅ Importación completada\n\n"
+            f"Registros importados: {result.inserted}\n"
+            f"Registros rechazados: {result.rejected}"
+        )
+    if result.errors:
+        message += "\n\n" + "\n".join(result.errors)
+
+    await update.message.reply_text(message)
+
+
+async def track_chat_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Record group membership passively from incoming group messages"""
+    chat = update.effective_chat
+    message = update.effective_message
+    if not chat or chat.type not in ["group", "supergroup"]:
+        return
+
+    async with AsyncSessionLocal() as db:
+        if message and message.left_chat_member:
+            await chat_service.remove_member(db, chat.id, message.left_chat_member.id)
+            return
+
+        members = list(message.new_chat_members) if message and message.new_chat_members else []
+        if update.effective_user:
+            members.append(update.effective_user)
+
+        for member in members:
+            if not member.is_bot:
+                await chat_service.add_member(db, chat.id, member.id)
 
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -344,6 +728,7 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     import logging
     logger = logging.getLogger(__name__)
     logger.error(f"Exception while handling an update: {context.error}")
+    HANDLER_ERRORS.labels(error=type(context.error).__name__).inc()
 
     if update and update.effective_message:
         await update.effective_message.reply_text(
@@ -0,0 +1,244 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from app.metrics import TELEGRAM_RETRY_AFTER, TELEGRAM_SEND_QUEUE_DELAY
+
+logger = logging.getLogger(__name__)
+
+# Prioridad por método de la Bot API (menor = antes). Las respuestas a botones
+# e interacciones van primero, los envíos masivos (archivos) al final.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REPLY = 1
+PRIORITY_BULK = 5
+ENDPOINT_PRIORITIES = {
+    "answerCallbackQuery": PRIORITY_INTERACTIVE,
+    "editMessageText": PRIORITY_INTERACTIVE,
+    "sendMessage": PRIORITY_REPLY,
+    "sendDocument": PRIORITY_BULK,
+}
+
+# Mensajes seguidos que un chat privado puede recibir antes de aplicar su límite
+PRIVATE_BURST = 3
+
+# Métodos que no envían mensajes y no cuentan para los límites de Telegram
+UNLIMITED_ENDPOINTS = {
+    "getMe", "getFile", "getUpdates", "getWebhookInfo", "setWebhook", "deleteWebhook",
+    "setMyCommands", "getChat", "getChatMember", "logOut", "close",
+}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        now = time.monotonic()
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        if self.tokens >= 1:
+            return blocked
+        return max(blocked, (1 - self.tokens) / self.rate)
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds` (used after a 429)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        """Wait for a token; waiters are served in arrival order"""
+        async with self._lock:
+            while (wait := self.delay()) > 0:
+                await asyncio.sleep(wait)
+            self.consume()
+
+
+class PriorityGate:
+    """Hands out tokens of a shared bucket to waiters in priority order"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="telegram-send-gate")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for _, _, future in self._waiters:
+            if not future.done():
+                future.cancel()
+        self._waiters.clear()
+
+    def qsize(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._wakeup.set()
+        await future
+
+    async def _run(self) -> None:
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            wait = self.bucket.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # Caller gave up (cancelled) while waiting
+            self.bucket.consume()
+            future.set_result(None)
+
+
+class TelegramRateLimiter(BaseRateLimiter[dict]):
+    """Send scheduler for outgoing Bot API requests.
+
+    Every request first waits on its chat's token bucket (groups and private
+    chats have different limits), then on the global bucket, which is handed
+    out in priority order. RetryAfter (429) responses pause the affected
+    bucket and the request is retried instead of failing the handler.
+    Callers may pass rate_limit_args={"priority": n} to override the default
+    priority of the endpoint.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        group_rate: float = 20 / 60,
+        private_rate: float = 1.0,
+        private_burst: int = PRIVATE_BURST,
+        max_retries: int = 3,
+        max_chats: int = 10000
+    ):
+        self.group_rate = group_rate
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._global = TokenBucket(global_rate, global_rate)
+        self._gate = PriorityGate(self._global)
+        self._chats: OrderedDict[Any, TokenBucket] = OrderedDict()
+
+    async def initialize(self) -> None:
+        self._gate.start()
+
+    async def shutdown(self) -> None:
+        await self._gate.stop()
+
+    def stats(self) -> dict:
+        return {"queued": self._gate.qsize(), "chats": len(self._chats)}
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is not None:
+            self._chats.move_to_end(chat_id)
+            return bucket
+
+        # Group and channel ids are negative (or @username for channels)
+        is_group = not isinstance(chat_id, int) or chat_id < 0
+        if is_group:
+            bucket = TokenBucket(self.group_rate, self.group_rate * 60)
+        else:
+            bucket = TokenBucket(self.private_rate, self.private_burst)
+        self._chats[chat_id] = bucket
+        if len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+        return bucket
+
+    async def process_request(
+        self,
+        callback,
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: dict | None
+    ):
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return await callback(*args, **kwargs)
+
+        priority = (rate_limit_args or {}).get(
+            "priority", ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_REPLY)
+        )
+        chat_id = data.get("chat_id")
+        chat_bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+        delay = TELEGRAM_SEND_QUEUE_DELAY.labels(priority=str(priority))
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            if chat_bucket is not None:
+                await chat_bucket.acquire()
+            await self._gate.acquire(priority)
+            delay.observe(time.perf_counter() - start)
+
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if not isinstance(retry_after, (int, float)):
+                    retry_after = retry_after.total_seconds()
+                TELEGRAM_RETRY_AFTER.labels(method=endpoint).inc()
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"{endpoint} to chat {chat_id} rate limited, retrying in {retry_after}s "
+                    f"(attempt {attempt}/{self.max_retries})"
+                )
+                # Flood limits are per chat; without a chat slow everything down
+                (chat_bucket or self._global).pause(retry_after)
+
+
+def rate_limiter_from_settings(settings) -> TelegramRateLimiter | None:
+    """Rate limiter configured from settings (None if disabled)
+
+    Buckets live in each worker process, so every budget (global, per chat
+    and bursts) is divided by the number of workers: together they never
+    exceed Telegram's limits, at the cost of a chat served by a single worker
+    getting only its share.
+    """
+    if not settings.TELEGRAM_RATE_LIMIT_ENABLED:
+        return None
+    workers = max(1, settings.WORKERS)
+    return TelegramRateLimiter(
+        global_rate=settings.TELEGRAM_GLOBAL_RATE / workers,
+        group_rate=settings.TELEGRAM_GROUP_RATE_PER_MINUTE / 60 / workers,
+        private_rate=settings.TELEGRAM_PRIVATE_RATE / workers,
+        private_burst=max(1, PRIVATE_BURST // workers),
+        max_retries=settings.TELEGRAM_MAX_RETRIES
+    )
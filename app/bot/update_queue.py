@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from telegram import Update
+from telegram.ext import Application
+from app.metrics import observe_update
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """Bounded queue of Telegram updates drained by a pool of workers.
+
+    Each worker owns its own queue and updates are routed by user (or chat)
+    id, so updates from the same user are always processed in order. When a
+    worker's queue is full, put() waits, applying backpressure to the webhook.
+    """
+
+    def __init__(self, application: Application, workers: int, maxsize: int):
+        self.application = application
+        self.workers = max(1, workers)
+        per_worker = max(1, maxsize // self.workers)
+        self._queues: list[asyncio.Queue[Update]] = [
+            asyncio.Queue(maxsize=per_worker) for _ in range(self.workers)
+        ]
+        self._tasks: list[asyncio.Task] = []
+        self._accepting = False
+
+    def _shard(self, update: Update) -> asyncio.Queue[Update]:
+        if update.effective_user:
+            key = update.effective_user.id
+        elif update.effective_chat:
+            key = update.effective_chat.id
+        else:
+            key = update.update_id
+        return self._queues[key % self.workers]
+
+    async def start(self) -> None:
+        """Start the worker tasks"""
+        self._accepting = True
+        self._tasks = [
+            asyncio.create_task(self._worker(queue), name=f"update-worker-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+        logger.info(f"Update queue started with {self.workers} workers")
+
+    async def put(self, update: Update) -> None:
+        """Enqueue an update, waiting while its worker queue is full"""
+        if not self._accepting:
+            raise RuntimeError("Update queue is not accepting updates")
+        await self._shard(update).put(update)
+
+    def qsize(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def stop(self, timeout: float | None = None) -> None:
+        """Stop accepting updates, drain pending ones and stop the workers"""
+        self._accepting = False
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Update queue drain timed out, dropping {self.qsize()} updates")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Update queue stopped")
+
+    async def _worker(self, queue: asyncio.Queue[Update]) -> None:
+        while True:
+            update = await queue.get()
+            try:
+                async with observe_update():
+                    await self.application.process_update(update)
+            except Exception as e:
+                logger.error(f"Error processing queued update {update.update_id}: {e}")
+            finally:
+                queue.task_done()
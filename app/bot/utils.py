@@ -1,5 +1,6 @@
 from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 
 def parse_date(date_str: str) -> date | None:
@@ -10,15 +11,19 @@ def parse_date(date_str: str) -> date | None:
         return None
 
 
+def month_range(day: date) -> tuple[date, date]:
+    """Return first and last day of the month containing day"""
+    start_date = day.replace(day=1)
+    # Get last day of month
+    end_date = start_date + relativedelta(months=1) - relativedelta(days=1)
+    return start_date, end_date
+
+
 def parse_month(month_str: str) -> tuple[date, date] | None:
     """Parse month string in YYYY-MM format and return start and end dates"""
     try:
         month_date = datetime.strptime(month_str, "%Y-%m")
-        start_date = month_date.date()
-        # Get last day of month
-        next_month = month_date + relativedelta(months=1)
-        end_date = next_month.date() - relativedelta(days=1)
-        return start_date, end_date
+        return month_range(month_date.date())
     except ValueError:
         return None
 
@@ -33,3 +38,131 @@ def format_exercise_list(exercises) -> str:
         lines.append(f"• {exercise.day}: {exercise.description}")
 
     return "\n".join(lines)
+
+
+def format_calendar(month: date, trained: set[date]) -> str:
+    """Render a month as a heatmap grid, one row per week (Monday to Sunday)"""
+    start_date, end_date = month_range(month)
+    today = date.today()
+    lines = []
+    row = ["▫️"] * start_date.weekday()
+    day = start_date
+    while day <= end_date:
+        if day in trained:
+            row.append("🟩")
+        elif day > today:
+            row.append("▫️")
+        else:
+            row.append("⬜")
+        if len(row) == 7:
+            lines.append("".join(row))
+            row = []
+        day += relativedelta(days=1)
+    if row:
+        lines.append("".join(row + ["▫️"] * (7 - len(row))))
+    lines.append("🟩 entrenado · ⬜ sin entrenar (semanas de lunes a domingo)")
+    return "\n".join(lines)
+
+
+def format_set(sets, reps, weight, duration_minutes) -> str:
+    """Format a parsed set as e.g. '3x10 @ 80 kg' or '20 min'"""
+    parts = []
+    if sets and reps:
+        parts.append(f"{sets}x{reps}")
+    if weight is not None:
+        parts.append(f"{weight:g} kg")
+    if duration_minutes is not None:
+        parts.append(f"{duration_minutes:g} min")
+    return " @ ".join(parts[:2]) + "".join(f", {part}" for part in parts[2:])
+
+
+def build_history_keyboard(
+    telegram_id: int,
+    exercises,
+    has_older: bool,
+    has_newer: bool
+) -> InlineKeyboardMarkup | None:
+    """Build older/newer paging buttons; callback data carries the (day, id) keyset cursor"""
+    buttons = []
+    if exercises and has_older:
+        last = exercises[-1]
+        buttons.append(InlineKeyboardButton(
+            "⬅️ Anteriores",
+            callback_data=f"hist:o:{telegram_id}:{last.day.isoformat()}:{last.id}"
+        ))
+    if exercises and has_newer:
+        first = exercises[0]
+        buttons.append(InlineKeyboardButton(
+            "Recientes ➡️",
+            callback_data=f"hist:n:{telegram_id}:{first.day.isoformat()}:{first.id}"
+        ))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+def parse_history_callback(data: str) -> tuple[str, int, date, int] | None:
+    """Parse history callback data into (direction, telegram_id, day, id)"""
+    try:
+        _, direction, telegram_id, day_str, exercise_id = data.split(":")
+        day = parse_date(day_str)
+        if direction not in ("o", "n") or not day:
+            return None
+        return direction, int(telegram_id), day, int(exercise_id)
+    except ValueError:
+        return None
+
+
+def format_search_results(terms: str, rows) -> str:
+    """Format search results; the first line carries the terms for the paging button"""
+    lines = [f"🔎 Resultados para: {terms}", ""]
+    for row in rows:
+        user = f" ({row.user})" if "user" in row._fields else ""
+        lines.append(f"• {row.day}{user}: {row.description}")
+    return "\n".join(lines)
+
+
+def parse_search_terms(text: str) -> str | None:
+    """Recover the search terms from the first line of a results message"""
+    first_line = text.split("\n", 1)[0]
+    prefix = "🔎 Resultados para: "
+    if not first_line.startswith(prefix):
+        return None
+    return first_line[len(prefix):]
+
+
+def build_search_keyboard(scope: str, scope_id: int, rows, has_more: bool) -> InlineKeyboardMarkup | None:
+    """Build the 'more results' button; callback data carries the scope and the (rank, id) cursor"""
+    if not rows or not has_more:
+        return None
+    last = rows[-1]
+    return InlineKeyboardMarkup([[InlineKeyboardButton(
+        "Más resultados ⬇️",
+        callback_data=f"srch:{scope}:{scope_id}:{last.rank!r}:{last.id}"
+    )]])
+
+
+def parse_search_callback(data: str) -> tuple[str, int, float, int] | None:
+    """Parse search callback data into (scope, telegram_id or chat_id, rank, id)"""
+    try:
+        _, scope, scope_id, rank, exercise_id = data.split(":")
+        if scope not in ("u", "c"):
+            return None
+        return scope, int(scope_id), float(rank), int(exercise_id)
+    except ValueError:
+        return None
+
+
+def format_digest(kind: str, start_date: date, end_date: date, leaderboard, top: int) -> str:
+    """Format a scheduled group digest: podium, top members and group total"""
+    if kind == "weekly":
+        message = f"📅 Resumen semanal del grupo ({start_date} a {end_date})\n\n"
+    else:
+        message = f"📅 Resumen del grupo - {start_date.strftime('%B %Y')}\n\n"
+
+    medals = ["🥇", "🥈", "🥉"]
+    for position, (name, days) in enumerate(leaderboard[:top]):
+        marker = medals[position] if position < len(medals) else "•"
+        message += f"{marker} {name}: {days} días\n"
+
+    total = sum(days for _, days in leaderboard)
+    message += f"\n{len(leaderboard)} miembros entrenaron {total} días en total. ¡Sigan así! 💪"
+    return message
@@ -0,0 +1,111 @@
+import logging
+from typing import Iterable
+from sqlalchemy import select, func
+from telegram import Bot
+from app.database import engine
+from app.services import chat_service
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson es opcional
+    from json import loads as json_loads
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock de Postgres que serializa el registro del webhook
+WEBHOOK_LOCK_ID = 0x67796D626F74  # "gymbot"
+
+# Respuesta al webhook ya serializada
+WEBHOOK_OK_BODY = b'{"ok":true}'
+
+GROUP_CHAT_TYPES = ("group", "supergroup")
+
+
+async def ensure_webhook(bot: Bot, url: str) -> bool:
+    """Register the webhook unless it already points to url. Returns True if it was set.
+
+    With several workers or replicas only one of them calls setWebhook: the
+    call is serialized with a Postgres advisory lock and the current webhook
+    is checked again once the lock is held.
+    """
+    info = await bot.get_webhook_info()
+    if info.url == url:
+        return False
+
+    if engine.dialect.name != "postgresql":
+        await bot.set_webhook(url=url)
+        return True
+
+    async with engine.begin() as conn:
+        # Transaction-level lock, released on commit
+        await conn.execute(select(func.pg_advisory_xact_lock(WEBHOOK_LOCK_ID)))
+        info = await bot.get_webhook_info()
+        if info.url == url:
+            return False
+        await bot.set_webhook(url=url)
+    return True
+
+
+class UpdateFilter:
+    """Checks a raw update dict against the handlers registered in app.main.
+
+    Updates none of them would act on (reactions, membership updates,
+    channel posts, unknown commands, chatter from group members already
+    recorded...) can be acknowledged without building Update objects. The
+    checks mirror python-telegram-bot's matching and err on the side of
+    passing an update through; process_update still makes the final call.
+    """
+
+    def __init__(self, commands: Iterable[str], callback_prefixes: Iterable[str], document_extensions: Iterable[str]):
+        self.commands = frozenset(command.lower() for command in commands)
+        self.callback_prefixes = tuple(callback_prefixes)
+        self.document_extensions = tuple(f".{extension.lower()}" for extension in document_extensions)
+        # Lowercase bot username, known once the bot is initialized (getMe)
+        self.username: str | None = None
+
+    def relevant(self, data: dict) -> bool:
+        callback = data.get("callback_query")
+        if callback is not None:
+            return (callback.get("data") or "").startswith(self.callback_prefixes)
+
+        # CommandHandler and MessageHandler also match edited messages
+        message = data.get("message") or data.get("edited_message")
+        is_post = message is None
+        if is_post:
+            # Channel posts reach MessageHandlers (which then filter by chat type), not CommandHandlers
+            message = data.get("channel_post") or data.get("edited_channel_post")
+            if message is None:
+                return False
+
+        chat_type = (message.get("chat") or {}).get("type")
+        if chat_type in GROUP_CHAT_TYPES and self._records_member(message):
+            return True
+        if chat_type == "private" and self._is_import(message):
+            return True
+        return not is_post and self._is_command(message)
+
+    def _records_member(self, message: dict) -> bool:
+        # Whether track_chat_member has something to write
+        if message.get("new_chat_members") or message.get("left_chat_member"):
+            return True
+        user = message.get("from")
+        if not user or user.get("is_bot"):
+            return False
+        return not chat_service.is_known_member(message["chat"]["id"], user["id"])
+
+    def _is_command(self, message: dict) -> bool:
+        text = message.get("text")
+        entities = message.get("entities")
+        if not text or not entities:
+            return False
+        entity = entities[0]
+        if entity.get("type") != "bot_command" or entity.get("offset") != 0:
+            return False
+        command, _, target = text[1:entity.get("length", 0)].partition("@")
+        if command.lower() not in self.commands:
+            return False
+        return not target or self.username is None or target.lower() == self.username
+
+    def _is_import(self, message: dict) -> bool:
+        file_name = (message.get("document") or {}).get("file_name")
+        return bool(file_name) and file_name.lower().endswith(self.document_extensions)
@@ -8,12 +8,78 @@ class Settings(BaseSettings):
     TELEGRAM_WEBHOOK_URL: str | None = None  # None = modo polling
     TELEGRAM_WEBHOOK_PATH: str = "/webhook/telegram"
     TELEGRAM_USE_POLLING: bool = False  # True = modo polling para desarrollo local
+    TELEGRAM_API_BASE_URL: str | None = None  # None = https://api.telegram.org/bot (p.ej. stub local en benchmarks)
+
+    # Rate limiting de envíos (límites de Telegram)
+    TELEGRAM_RATE_LIMIT_ENABLED: bool = True
+    TELEGRAM_GLOBAL_RATE: float = 30.0  # Mensajes por segundo en total
+    TELEGRAM_GROUP_RATE_PER_MINUTE: float = 20.0  # Mensajes por minuto por grupo
+    TELEGRAM_PRIVATE_RATE: float = 1.0  # Mensajes por segundo por chat privado
+    TELEGRAM_MAX_RETRIES: int = 3  # Reintentos tras un 429 (RetryAfter)
+
+    # Resúmenes semanales/mensuales en grupos
+    DIGEST_SCHEDULER: str = "off"  # off (por defecto, no publica nada) | app = dentro de la app | worker = python -m app.manage digests
+    DIGEST_KINDS: str = "weekly,monthly"  # Separados por comas
+    DIGEST_HOUR: int = 9  # Hora (del servidor) desde la que se publica el resumen del periodo cerrado
+    DIGEST_CHECK_INTERVAL: float = 300.0  # Segundos entre comprobaciones de resúmenes pendientes
+    DIGEST_BATCH_SIZE: int = 500  # Grupos por consulta y por tanda de envíos
+    DIGEST_TOP: int = 10  # Miembros listados en cada resumen
+
+    # Webhook ingestion
+    WEBHOOK_QUEUE_ENABLED: bool = False  # True = responder al webhook y procesar en cola
+    WEBHOOK_QUEUE_WORKERS: int = 4
+    WEBHOOK_QUEUE_MAXSIZE: int = 1000
+    WEBHOOK_QUEUE_DRAIN_TIMEOUT: float = 10.0  # Segundos para vaciar la cola al apagar
+    WEBHOOK_FILTER_UPDATES: bool = True  # Confirmar sin procesar los updates que ningún handler atiende
+    UPDATE_DEDUP: str = "db"  # db = memoria + tabla processed_updates (varios workers/réplicas) | memory = solo este proceso | off
+    UPDATE_DEDUP_SIZE: int = 100000  # update_id recordados en memoria
+    UPDATE_DEDUP_TTL: float = 86400.0  # Segundos que se guarda cada update_id (Telegram reintenta hasta 24 h)
 
     # Database
     DATABASE_URL: str
+    DATABASE_READ_URL: str | None = None  # Réplica de lectura para estadísticas (None = todo al primario)
+    DB_READ_MAX_LAG: float = 5.0  # Segundos de retraso de la réplica sobre los que se lee del primario
+    DB_READ_LAG_CHECK_INTERVAL: float = 2.0  # Segundos entre mediciones del retraso de la réplica
+    MIGRATIONS: str = "upgrade"  # upgrade = el entrypoint aplica alembic upgrade head | check = solo verificar al iniciar | off
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # Segundos antes de reciclar una conexión (-1 = nunca)
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_WARMUP: bool = True  # Abrir DB_POOL_SIZE conexiones al iniciar
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Cache de prepared statements de asyncpg (0 = desactivado)
+
+    # Particiones mensuales de exercises (solo Postgres)
+    PARTITION_MAINTENANCE: str = "off"  # off (por defecto) | app = tarea periódica dentro de la app | cron = python -m app.manage partitions
+    PARTITION_MONTHS_AHEAD: int = 3  # Meses futuros con su partición creada de antemano
+    PARTITION_ARCHIVE_AFTER_MONTHS: int = 0  # Meses cerrados que quedan en el esquema principal (0 = no archivar)
+    PARTITION_ARCHIVE_MODE: str = "move"  # move = mover al esquema de archivo (se sigue consultando) | detach = además desadjuntar
+    PARTITION_ARCHIVE_SCHEMA: str = "archive"
+    PARTITION_ARCHIVE_TABLESPACE: str | None = None  # Tablespace de las particiones archivadas (p.ej. disco más barato o comprimido)
+
+    # Write batching (group commit de inserts concurrentes)
+    WRITE_BATCH_ENABLED: bool = False
+    WRITE_BATCH_MAX_DELAY_MS: float = 5.0
+    WRITE_BATCH_MAX_SIZE: int = 100
+
+    # Caches
+    IDENTITY_CACHE_SIZE: int = 10000  # 0 = desactivado
+    IDENTITY_CACHE_TTL: float = 3600.0  # Segundos
+    STATS_CACHE_BACKEND: str = "memory"  # memory | redis | none
+    STATS_CACHE_SIZE: int = 10000  # Entradas del mes en curso (LRU con TTL)
+    STATS_CACHE_PINNED_SIZE: int = 10000  # Entradas de meses cerrados (sin TTL)
+    STATS_CACHE_TTL: float = 3600.0  # Segundos
+    REDIS_URL: str | None = None  # p.ej. redis://redis:6379/0
+
+    # API
+    API_KEY: str | None = None  # None = API REST desactivada
+    IMPORT_CHUNK_SIZE: int = 1000  # Filas por transacción en importaciones masivas
+    EXPORT_BATCH_SIZE: int = 1000  # Filas por lectura del cursor en exportaciones
+    EXPORT_FILE_MAX_ROWS: int = 50000  # Filas por archivo enviado por /export
 
     # App
     DEBUG: bool = False
+    WORKERS: int = 1  # Procesos uvicorn (docker-entrypoint.sh usa --workers)
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,13 +1,65 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Iterable
+from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import get_settings
+from app import metrics
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts take (waiting or opening a connection)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+
+def _engine_options(url: str) -> dict:
+    """Pool and driver options from settings (SQLite keeps its default pool)"""
+    if url.startswith("sqlite"):
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if "+asyncpg" in url:
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+        }
+    return options
+
 
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    future=True
+    future=True,
+    **_engine_options(settings.DATABASE_URL)
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -16,9 +68,227 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Optional read replica for stats and other read-only queries
+read_engine = create_async_engine(
+    settings.DATABASE_READ_URL,
+    echo=settings.DEBUG,
+    future=True,
+    **_engine_options(settings.DATABASE_READ_URL)
+) if settings.DATABASE_READ_URL else None
+
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+) if read_engine else None
+
+metrics.instrument_engine(engine)
+if read_engine:
+    metrics.instrument_engine(read_engine, count_checkouts=False)
+
 Base = declarative_base()
 
 
+def dialect_insert(db: AsyncSession):
+    """Return the dialect-specific insert construct (supports ON CONFLICT)"""
+    # Imported here so only the dialect in use gets loaded
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+@asynccontextmanager
+async def try_advisory_lock(lock_id: int):
+    """Try a session-level Postgres advisory lock on a connection of its own.
+
+    Yields the connection holding the lock, or None if another process holds
+    it (callers skip the round instead of waiting). The lock outlives the
+    transactions the caller commits on that connection and is released on exit.
+    """
+    async with engine.connect() as conn:
+        locked = await conn.scalar(select(func.pg_try_advisory_lock(lock_id)))
+        await conn.commit()
+        if not locked:
+            yield None
+            return
+        try:
+            yield conn
+        finally:
+            # A failed transaction would make the unlock fail too
+            await conn.rollback()
+            await conn.execute(select(func.pg_advisory_unlock(lock_id)))
+            await conn.commit()
+
+
+# Reads of a user who wrote recently are kept on the primary for this many users at most
+_MAX_RECENT_WRITERS = 10_000
+
+# Seconds the replica is behind the primary (0 when it has replayed everything it received;
+# after a restart the receive position starts at the segment boundary, behind replay)
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() <= pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaRouter:
+    """Decides whether a read-only session can use the read replica.
+
+    A background task measures the replica lag every check_interval
+    seconds. Reads go to the primary while the lag is unknown (replica
+    down, not measured yet) or above max_lag. For read-your-writes, a user
+    who wrote in the last max_lag + check_interval seconds reads from the
+    primary too: by then the replica has replayed the write, or its lag
+    has been seen to exceed max_lag.
+    """
+
+    def __init__(self, max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.window = max_lag + check_interval
+        self.lag: float | None = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        metrics.DB_REPLICA_LAG.set(-1)
+        self._writers: OrderedDict[int, float] = OrderedDict()
+        self._primary_until = 0.0
+        self._task: asyncio.Task | None = None
+
+    def wrote(self, telegram_ids: Iterable[int]) -> None:
+        """Keep these users' reads on the primary until the replica has their writes"""
+        until = time.monotonic() + self.window
+        for telegram_id in telegram_ids:
+            self._writers[telegram_id] = until
+            self._writers.move_to_end(telegram_id)
+        while len(self._writers) > _MAX_RECENT_WRITERS:
+            self._writers.popitem(last=False)
+
+    def wrote_many(self) -> None:
+        """A write too large to list its users: send every read to the primary for a while"""
+        self._primary_until = time.monotonic() + self.window
+
+    def clear(self) -> None:
+        # Writes announced by other processes may have been missed
+        self.wrote_many()
+
+    def use_replica(self, telegram_id: int | None = None) -> bool:
+        if self.lag is None or self.lag > self.max_lag:
+            return False
+        now = time.monotonic()
+        if now < self._primary_until:
+            return False
+        if telegram_id is not None:
+            until = self._writers.get(telegram_id)
+            if until is not None:
+                if until > now:
+                    return False
+                del self._writers[telegram_id]
+        return True
+
+    async def check_lag(self) -> float:
+        if read_engine.dialect.name != "postgresql":
+            return 0.0
+        async with read_engine.connect() as conn:
+            return float(await conn.scalar(REPLICA_LAG_SQL))
+
+    async def start(self) -> None:
+        """Measure the replica lag periodically in the background (primary until the first measurement)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._monitor(), name="replica-lag")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _measure(self) -> None:
+        try:
+            lag = await self.check_lag()
+        except Exception as e:
+            if self.lag is not None:
+                logger.warning(f"Read replica unavailable, reading from the primary: {e}")
+            self.lag = None
+            metrics.DB_REPLICA_LAG.set(-1)
+            return
+        if lag > self.max_lag and (self.lag is None or self.lag <= self.max_lag):
+            logger.warning(f"Read replica is {lag:.1f}s behind, reading from the primary")
+        self.lag = lag
+        metrics.DB_REPLICA_LAG.set(lag)
+
+    async def _monitor(self) -> None:
+        while True:
+            await self._measure()
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> dict:
+        return {
+            "lag_seconds": self.lag,
+            "max_lag_seconds": self.max_lag,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads
+        }
+
+
+replica_router = ReplicaRouter(
+    max_lag=settings.DB_READ_MAX_LAG,
+    check_interval=settings.DB_READ_LAG_CHECK_INTERVAL
+) if read_engine else None
+
+
+def read_session(telegram_id: int | None = None) -> AsyncSession:
+    """Session for read-only queries: the replica when it is usable for telegram_id, else the primary"""
+    if replica_router is None:
+        return AsyncSessionLocal()
+    if replica_router.use_replica(telegram_id):
+        replica_router.replica_reads += 1
+        metrics.DB_REPLICA_READS.inc()
+        return ReadSessionLocal()
+    replica_router.primary_reads += 1
+    metrics.DB_PRIMARY_READS.inc()
+    return AsyncSessionLocal()
+
+
+async def warm_up_pool(connections: int, target=engine) -> int:
+    """Open connections up front so the first requests don't pay connection setup"""
+    if not isinstance(target.pool, InstrumentedQueuePool):
+        return 0
+    connections = min(connections, target.pool.size())
+
+    # Check out all connections at once so each one is a distinct pool slot
+    conns = [target.connect() for _ in range(connections)]
+    try:
+        await asyncio.gather(*(conn.start() for conn in conns))
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in conns), return_exceptions=True)
+    return connections
+
+
+def pool_stats(target=engine) -> dict:
+    """Snapshot of connection pool usage"""
+    pool = target.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"pool": pool.__class__.__name__}
+
+    return {
+        "pool": pool.__class__.__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "wait_count": pool.wait_count,
+        "wait_avg_ms": pool.wait_total / pool.wait_count * 1000 if pool.wait_count else 0.0,
+        "wait_max_ms": pool.wait_max * 1000
+    }
+
+
 async def get_db():
     """Dependency for getting async database session"""
     async with AsyncSessionLocal() as session:
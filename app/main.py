@@ -1,11 +1,34 @@
-from fastapi import FastAPI, Request
+import time
+
+# Inicio de la importación de la app: el arranque total se mide desde aquí
+STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST
 from telegram import Update
-from telegram.ext import Application, CommandHandler
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, MessageHandler, filters
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
+import re
 
 from app.config import get_settings
+from app.database import read_engine, replica_router, warm_up_pool, pool_stats
+from app.migrations import check_migrations
+from app.startup import startup
 from app.bot import handlers
+from app.api import router as api_router
+from app import metrics
+from app.bot.rate_limiter import rate_limiter_from_settings
+from app.bot.digests import digest_scheduler_from_settings
+from app.bot.update_queue import UpdateQueue
+from app.bot.webhook import WEBHOOK_OK_BODY, UpdateFilter, ensure_webhook, json_loads
+from app.services.cache_bus import cache_bus
+from app.services.partition_service import partition_maintainer
+from app.services.stats_cache import stats_cache
+from app.services.update_dedup import update_dedup
+from app.services.write_batcher import exercise_batcher
 
 # Setup logging
 logging.basicConfig(
@@ -16,45 +39,200 @@ logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
-# Initialize Telegram bot application
-telegram_app = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+# Initialize Telegram bot application (Bot API calls are timed for /metrics)
+builder = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).request(
+    metrics.InstrumentedHTTPXRequest(connection_pool_size=256)
+)
+if settings.TELEGRAM_API_BASE_URL:
+    builder = builder.base_url(settings.TELEGRAM_API_BASE_URL)
 
+# Outgoing messages go through a send scheduler that respects Telegram limits
+rate_limiter = rate_limiter_from_settings(settings)
+if rate_limiter:
+    builder = builder.rate_limiter(rate_limiter)
+telegram_app = builder.build()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Manage application lifecycle - startup and shutdown"""
-    # Startup
-    logger.info("Starting GymBot application...")
+# Optional queue so the webhook acknowledges updates before processing them
+update_queue = UpdateQueue(
+    telegram_app,
+    workers=settings.WEBHOOK_QUEUE_WORKERS,
+    maxsize=settings.WEBHOOK_QUEUE_MAXSIZE
+) if settings.WEBHOOK_QUEUE_ENABLED else None
+
+# Weekly/monthly group digests (or run them with `python -m app.manage digests`)
+digest_scheduler = digest_scheduler_from_settings(
+    telegram_app.bot, settings
+) if settings.DIGEST_SCHEDULER == "app" else None
+
+# Bot commands and their handlers
+COMMANDS = [
+    ("start", handlers.start_command),
+    ("help", handlers.help_command),
+    ("add", handlers.add_command),
+    ("add_past", handlers.add_past_command),
+    ("stats", handlers.stats_command),
+    ("stats_month", handlers.stats_month_command),
+    ("stats_custom", handlers.stats_custom_command),
+    ("streak", handlers.streak_command),
+    ("calendar", handlers.calendar_command),
+    ("history", handlers.history_command),
+    ("search", handlers.search_command),
+    ("pr", handlers.pr_command),
+    ("progress", handlers.progress_command),
+    ("export", handlers.export_command),
+]
+
+# Inline button callbacks by callback_data prefix
+CALLBACKS = [
+    ("hist:", handlers.history_callback),  # Paging of /history
+    ("srch:", handlers.search_callback),  # "More results" of /search
+]
+
+# Files accepted for bulk import (private chats)
+IMPORT_EXTENSIONS = ["csv", "json", "jsonl"]
 
-    # Register bot command handlers
-    telegram_app.add_handler(CommandHandler("start", handlers.start_command))
-    telegram_app.add_handler(CommandHandler("help", handlers.help_command))
-    telegram_app.add_handler(CommandHandler("add", handlers.add_command))
-    telegram_app.add_handler(CommandHandler("add_past", handlers.add_past_command))
-    telegram_app.add_handler(CommandHandler("stats", handlers.stats_command))
-    telegram_app.add_handler(CommandHandler("stats_month", handlers.stats_month_command))
-    telegram_app.add_handler(CommandHandler("stats_custom", handlers.stats_custom_command))
+# Lets the webhook acknowledge updates no handler above would act on
+update_filter = UpdateFilter(
+    commands=[command for command, _ in COMMANDS],
+    callback_prefixes=[prefix for prefix, _ in CALLBACKS],
+    document_extensions=IMPORT_EXTENSIONS
+) if settings.WEBHOOK_FILTER_UPDATES else None
+
+
+def _register_handlers() -> None:
+    # Track group membership before any command runs (separate handler group)
+    telegram_app.add_handler(
+        MessageHandler(filters.ChatType.GROUPS, handlers.track_chat_member),
+        group=-1
+    )
+
+    # Register bot command handlers (timed per command)
+    for command, callback in COMMANDS:
+        telegram_app.add_handler(CommandHandler(command, metrics.timed_command(command, callback)))
+
+    # Inline buttons
+    for prefix, callback in CALLBACKS:
+        telegram_app.add_handler(CallbackQueryHandler(callback, pattern=f"^{re.escape(prefix)}"))
+
+    # Bulk import from uploaded CSV/JSON files (private chats)
+    document_filter = filters.Document.FileExtension(IMPORT_EXTENSIONS[0])
+    for extension in IMPORT_EXTENSIONS[1:]:
+        document_filter = document_filter | filters.Document.FileExtension(extension)
+    telegram_app.add_handler(MessageHandler(
+        filters.ChatType.PRIVATE & document_filter,
+        handlers.import_document
+    ))
 
     # Register error handler
     telegram_app.add_error_handler(handlers.error_handler)
 
-    # Initialize bot
+
+async def _check_schema() -> None:
+    revision = await check_migrations()
+    logger.info(f"Database schema is up to date ({revision})")
+
+
+async def _warm_up_database() -> None:
+    try:
+        warmed = await warm_up_pool(settings.DB_POOL_SIZE)
+        logger.info(f"Database pool warmed up with {warmed} connections")
+        if read_engine:
+            warmed = await warm_up_pool(settings.DB_POOL_SIZE, read_engine)
+            logger.info(f"Read replica pool warmed up with {warmed} connections")
+    except Exception as e:
+        logger.warning(f"Database pool warm-up failed: {e}")
+
+
+async def _start_telegram() -> None:
+    # initialize() calls getMe
     await telegram_app.initialize()
     await telegram_app.start()
+    if update_filter:
+        update_filter.username = telegram_app.bot.username.lower()
 
-    # Set webhook
+
+async def _register_webhook() -> None:
+    # Set webhook (once across workers, skipped if already registered)
     webhook_url = f"{settings.TELEGRAM_WEBHOOK_URL}{settings.TELEGRAM_WEBHOOK_PATH}"
-    await telegram_app.bot.set_webhook(url=webhook_url)
-    logger.info(f"Webhook set to: {webhook_url}")
+    if await ensure_webhook(telegram_app.bot, webhook_url):
+        logger.info(f"Webhook set to: {webhook_url}")
+    else:
+        logger.info(f"Webhook already set to: {webhook_url}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Manage application lifecycle - startup and shutdown"""
+    # Startup
+    startup.record("imports", time.perf_counter() - STARTED)
+    logger.info("Starting GymBot application...")
+    if settings.WORKERS > 1 and not metrics.MULTIPROCESS:
+        logger.error("WORKERS > 1 without PROMETHEUS_MULTIPROC_DIR: /metrics is disabled")
+
+    async with startup.phase("handlers"):
+        _register_handlers()
+
+    # Independent network round trips run concurrently
+    phases = [startup.run("telegram", _start_telegram())]
+    if settings.MIGRATIONS == "check":
+        phases.append(startup.run("migrations", _check_schema()))
+    if settings.DB_POOL_WARMUP:
+        phases.append(startup.run("db_pool", _warm_up_database()))
+    errors = [
+        result for result in await asyncio.gather(*phases, return_exceptions=True)
+        if isinstance(result, Exception)
+    ]
+    if errors:
+        # e.g. MIGRATIONS=check with a schema behind the image: don't leave the bot running
+        if telegram_app.running:
+            await telegram_app.stop()
+        await telegram_app.shutdown()
+        raise errors[0]
+
+    async with startup.phase("services"):
+        # Cache invalidations from other workers/replicas
+        await cache_bus.start()
+        if replica_router:
+            await replica_router.start()
+        if update_queue:
+            await update_queue.start()
+        if update_dedup:
+            await update_dedup.start()
+        if digest_scheduler:
+            await digest_scheduler.start()
+        if partition_maintainer:
+            await partition_maintainer.start()
+
+    # Updates are accepted meanwhile: an existing webhook keeps delivering them
+    webhook_task = asyncio.create_task(startup.run("webhook", _register_webhook(), required=False))
 
-    logger.info("GymBot application started successfully!")
+    startup.mark_ready(STARTED)
+    logger.info(f"GymBot application started successfully in {startup.phases['total'] * 1000:.0f} ms!")
 
     yield
 
     # Shutdown
     logger.info("Shutting down GymBot application...")
+    startup.mark_stopping()
+    webhook_task.cancel()
+    await asyncio.gather(webhook_task, return_exceptions=True)
+    if update_queue:
+        await update_queue.stop(timeout=settings.WEBHOOK_QUEUE_DRAIN_TIMEOUT)
+    if exercise_batcher:
+        await exercise_batcher.flush()
+    if update_dedup:
+        await update_dedup.stop()
+    if digest_scheduler:
+        await digest_scheduler.stop()
+    if partition_maintainer:
+        await partition_maintainer.stop()
     await telegram_app.stop()
     await telegram_app.shutdown()
+    await cache_bus.stop()
+    if replica_router:
+        await replica_router.stop()
+    await stats_cache.close()
+    metrics.mark_process_dead()
     logger.info("GymBot application stopped.")
 
 
@@ -66,25 +244,43 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.include_router(api_router)
+
+
+def _webhook_ok() -> Response:
+    return Response(WEBHOOK_OK_BODY, media_type="application/json")
+
 
 # Telegram webhook endpoint
 @app.post(settings.TELEGRAM_WEBHOOK_PATH)
 async def telegram_webhook(request: Request):
     """Handle incoming updates from Telegram"""
-    try:
-        data = await request.json()
-        update = Update.de_json(data, telegram_app.bot)
-        await telegram_app.process_update(update)
-        return {"ok": True}
-    except Exception as e:
-        logger.error(f"Error processing webhook: {e}")
-        return {"ok": False, "error": str(e)}
+    with metrics.WEBHOOK_LATENCY.time():
+        try:
+            data = json_loads(await request.body())
+            # Checked on the raw dict, before building any Update object
+            if update_filter and not update_filter.relevant(data):
+                metrics.UPDATES_IGNORED.inc()
+                return _webhook_ok()
+            # Telegram redelivers updates it considers unanswered: acknowledge repeats only
+            if update_dedup and "update_id" in data and not await update_dedup.claim(data["update_id"]):
+                return _webhook_ok()
+            update = Update.de_json(data, telegram_app.bot)
+            if update_queue:
+                await update_queue.put(update)
+            else:
+                async with metrics.observe_update():
+                    await telegram_app.process_update(update)
+            return _webhook_ok()
+        except Exception as e:
+            logger.error(f"Error processing webhook: {e}")
+            return {"ok": False, "error": str(e)}
 
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check (answers as soon as the process serves; readiness is /ready)"""
     return {
         "status": "healthy",
         "service": "GymBot",
@@ -92,6 +288,46 @@ async def health_check():
     }
 
 
+# Readiness endpoint (503 while starting or shutting down)
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness probe with the duration of each startup phase"""
+    status = startup.status()
+    if metrics.MULTIPROCESS:
+        # Any worker may answer the probe: ready once every worker is
+        status["workers"] = {"ready": metrics.workers_ready(), "expected": settings.WORKERS}
+        if status["status"] == "ready" and status["workers"]["ready"] < settings.WORKERS:
+            status["status"] = "starting"
+    if status["status"] != "ready":
+        response.status_code = 503
+    return status
+
+
+# Prometheus metrics endpoint
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics (command latency, DB queries per update, Bot API latency, errors)"""
+    if settings.WORKERS > 1 and not metrics.MULTIPROCESS:
+        # Each scrape would land on a different worker and counters would jump around
+        return Response(
+            "WORKERS > 1 requires PROMETHEUS_MULTIPROC_DIR (set by docker-entrypoint.sh)\n",
+            status_code=503,
+            media_type="text/plain"
+        )
+    return Response(metrics.latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+# Database pool stats endpoint
+@app.get("/health/pool")
+async def pool_health():
+    """Connection pool usage (checked out, overflow, wait time) and read replica routing"""
+    # Per process: with several workers, pid tells which one answered
+    stats = {"pid": os.getpid(), **pool_stats()}
+    if read_engine:
+        stats["replica"] = {**pool_stats(read_engine), **replica_router.stats()}
+    return stats
+
+
 # Root endpoint
 @app.get("/")
 async def root():
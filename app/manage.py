@@ -0,0 +1,106 @@
+"""Maintenance commands.
+
+Usage: python -m app.manage <command> [options]
+"""
+import argparse
+import asyncio
+import logging
+
+from telegram.ext import ExtBot
+
+from app.bot.digests import digest_scheduler_from_settings
+from app.bot.rate_limiter import rate_limiter_from_settings
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.services import exercise_service, partition_service, workout_service
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_counts(args: argparse.Namespace) -> None:
+    """Rebuild monthly exercise rollups and training-day masks from the exercises table"""
+    settings = get_settings()
+    async with AsyncSessionLocal() as db:
+        # Detached months are no longer in exercises: keep their rollups
+        since = await partition_service.detached_until(db, settings.PARTITION_ARCHIVE_SCHEMA)
+        if since:
+            logger.info(f"Keeping rollups before {since} (detached partitions)")
+        rows = await exercise_service.rebuild_monthly_counts(db, user_id=args.user_id, since=since)
+    logger.info(f"Rebuilt {rows} monthly count rows")
+
+
+async def backfill_sets(args: argparse.Namespace) -> None:
+    """Parse lifts, sets and weights from existing exercise descriptions"""
+    async with AsyncSessionLocal() as db:
+        scanned, inserted = await workout_service.backfill_sets(
+            db,
+            user_id=args.user_id,
+            batch_size=args.batch_size,
+            reparse=args.reparse
+        )
+    logger.info(f"Parsed {scanned} exercises into {inserted} sets")
+
+
+async def digests(args: argparse.Namespace) -> None:
+    """Post weekly/monthly group digests (set DIGEST_SCHEDULER=worker in the app)"""
+    settings = get_settings()
+    bot_options = {"base_url": settings.TELEGRAM_API_BASE_URL} if settings.TELEGRAM_API_BASE_URL else {}
+    async with ExtBot(
+        settings.TELEGRAM_BOT_TOKEN,
+        rate_limiter=rate_limiter_from_settings(settings),
+        **bot_options
+    ) as bot:
+        scheduler = digest_scheduler_from_settings(bot, settings)
+        if args.once:
+            sent = await scheduler.run_due()
+            logger.info(f"Group digests sent: {sent or 'nothing to send'}")
+            return
+        await scheduler.start()
+        logger.info("Digest worker started")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await scheduler.stop()
+
+
+async def partitions(args: argparse.Namespace) -> None:
+    """Create upcoming monthly partitions of exercises and archive old ones (Postgres)"""
+    maintainer = partition_service.partition_maintainer_from_settings(get_settings())
+    changes = await maintainer.run()
+    if not changes:
+        logger.info("exercises is not partitioned or another process is maintaining it")
+        return
+    logger.info(f"Partitions created: {len(changes['created'])}, archived: {len(changes['archived'])}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="GymBot maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild-counts", help=rebuild_counts.__doc__)
+    rebuild.add_argument("--user-id", type=int, default=None, help="Only rebuild this user (internal ID)")
+    rebuild.set_defaults(func=rebuild_counts)
+
+    backfill = subparsers.add_parser("backfill-sets", help=backfill_sets.__doc__)
+    backfill.add_argument("--user-id", type=int, default=None, help="Only parse this user (internal ID)")
+    backfill.add_argument("--batch-size", type=int, default=1000, help="Exercises per transaction")
+    backfill.add_argument("--reparse", action="store_true", help="Replace sets that were already parsed")
+    backfill.set_defaults(func=backfill_sets)
+
+    digest = subparsers.add_parser("digests", help=digests.__doc__)
+    digest.add_argument("--once", action="store_true", help="Send due digests and exit (for cron)")
+    digest.set_defaults(func=digests)
+
+    partition = subparsers.add_parser("partitions", help=partitions.__doc__)
+    partition.set_defaults(func=partitions)
+
+    args = parser.parse_args()
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+from telegram.request import HTTPXRequest
+
+from app.config import get_settings
+
+# Con varios workers de uvicorn cada proceso escribe sus métricas en este directorio
+# (lo prepara docker-entrypoint.sh) y /metrics las suma
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+COMMAND_LATENCY = Histogram(
+    "gymbot_command_duration_seconds",
+    "Time spent in a bot command handler",
+    ["command"]
+)
+WEBHOOK_LATENCY = Histogram(
+    "gymbot_webhook_duration_seconds",
+    "Time from receiving a webhook request to responding"
+)
+UPDATE_DB_QUERIES = Histogram(
+    "gymbot_update_db_queries",
+    "DB queries executed while processing one update",
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50)
+)
+UPDATE_DB_TIME = Histogram(
+    "gymbot_update_db_duration_seconds",
+    "Time spent in DB queries while processing one update"
+)
+UPDATES_IGNORED = Counter(
+    "gymbot_updates_ignored_total",
+    "Updates acknowledged without processing because no handler would act on them"
+)
+DB_QUERIES = Counter("gymbot_db_queries_total", "DB queries executed")
+DB_QUERY_LATENCY = Histogram("gymbot_db_query_duration_seconds", "Duration of a single DB query")
+TELEGRAM_API_LATENCY = Histogram(
+    "gymbot_telegram_api_duration_seconds",
+    "Latency of Bot API calls",
+    ["method"]
+)
+TELEGRAM_SEND_QUEUE_DELAY = Histogram(
+    "gymbot_telegram_send_queue_seconds",
+    "Time an outgoing Bot API request waited in the rate limiter",
+    ["priority"]
+)
+TELEGRAM_RETRY_AFTER = Counter(
+    "gymbot_telegram_retry_after_total",
+    "Bot API requests rejected with 429 RetryAfter",
+    ["method"]
+)
+GROUP_DIGESTS = Counter(
+    "gymbot_group_digests_total",
+    "Scheduled group digests by outcome",
+    ["kind", "status"]
+)
+HANDLER_ERRORS = Counter(
+    "gymbot_handler_errors_total",
+    "Exceptions reported to the bot error handler",
+    ["error"]
+)
+
+STARTUP_PHASE_SECONDS = Gauge(
+    "gymbot_startup_phase_seconds",
+    "Duration of each startup phase (slowest live worker)",
+    ["phase"],
+    multiprocess_mode="livemax"
+)
+WORKER_READY = Gauge(
+    "gymbot_worker_ready",
+    "Whether a worker finished starting up and accepts traffic",
+    multiprocess_mode="liveall"
+)
+
+IDENTITY_CACHE_HITS = Counter("gymbot_identity_cache_hits_total", "Identity cache hits")
+IDENTITY_CACHE_MISSES = Counter("gymbot_identity_cache_misses_total", "Identity cache misses")
+STATS_CACHE_HITS = Counter("gymbot_stats_cache_hits_total", "Stats cache hits")
+STATS_CACHE_MISSES = Counter("gymbot_stats_cache_misses_total", "Stats cache misses")
+UPDATES_CHECKED = Counter("gymbot_updates_checked_total", "Updates checked for redelivery by update_id")
+UPDATES_DUPLICATE = Counter(
+    "gymbot_updates_duplicate_total",
+    "Redelivered updates acknowledged without processing"
+)
+PARTITIONS_CREATED = Counter("gymbot_partitions_created_total", "Monthly exercises partitions created")
+PARTITIONS_ARCHIVED = Counter("gymbot_partitions_archived_total", "Monthly exercises partitions archived")
+DB_POOL_CHECKED_OUT = Gauge(
+    "gymbot_db_pool_checked_out",
+    "Connections currently checked out from the primary pool",
+    multiprocess_mode="livesum"
+)
+if get_settings().DATABASE_READ_URL:
+    DB_REPLICA_LAG = Gauge(
+        "gymbot_db_replica_lag_seconds",
+        "Measured read replica lag (-1 = unavailable)",
+        multiprocess_mode="liveall"
+    )
+    DB_REPLICA_READS = Counter("gymbot_db_replica_reads_total", "Read-only sessions opened on the replica")
+    DB_PRIMARY_READS = Counter(
+        "gymbot_db_primary_reads_total",
+        "Read-only sessions sent to the primary (lag or read-your-writes)"
+    )
+
+
+class _UpdateStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# DB accounting for the update being processed in the current task
+_update_stats: ContextVar[_UpdateStats | None] = ContextVar("update_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_LATENCY.observe(elapsed)
+
+    stats = _update_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+
+def _checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+
+
+def instrument_engine(engine, count_checkouts: bool = True) -> None:
+    """Account the queries of engine (the primary and the read replica alike) and its pool checkouts"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+    if count_checkouts:
+        event.listen(engine.sync_engine.pool, "checkout", _checkout)
+        event.listen(engine.sync_engine.pool, "checkin", _checkin)
+
+
+def latest() -> bytes:
+    """Metrics in the text exposition format: this process, or every worker in multiprocess mode"""
+    if not MULTIPROCESS:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def workers_ready() -> int:
+    """Live workers that finished starting up (multiprocess mode)"""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    ready = 0
+    for metric in registry.collect():
+        if metric.name != "gymbot_worker_ready":
+            continue
+        for sample in metric.samples:
+            # Files of workers that died without shutting down are left behind
+            if sample.value and _alive(int(sample.labels["pid"])):
+                ready += 1
+    return ready
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges (call on shutdown in multiprocess mode)"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+@asynccontextmanager
+async def observe_update():
+    """Account DB queries and time spent while processing one update"""
+    stats = _UpdateStats()
+    token = _update_stats.set(stats)
+    try:
+        yield
+    finally:
+        _update_stats.reset(token)
+        UPDATE_DB_QUERIES.observe(stats.queries)
+        UPDATE_DB_TIME.observe(stats.db_time)
+
+
+def timed_command(command: str, callback):
+    """Wrap a command handler to record its latency"""
+    histogram = COMMAND_LATENCY.labels(command=command)
+
+    @wraps(callback)
+    async def wrapper(update, context):
+        with histogram.time():
+            return await callback(update, context)
+
+    return wrapper
+
+
+class InstrumentedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that records Bot API latency per method"""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        finally:
+            api_method = url.rsplit("/", 1)[-1]
+            TELEGRAM_API_LATENCY.labels(method=api_method).observe(time.perf_counter() - start)
@@ -0,0 +1,79 @@
+from pathlib import Path
+from sqlalchemy import inspect, text
+from app.database import engine
+
+# Migraciones versionadas que vienen con la app (alembic/versions)
+ALEMBIC_DIR = Path(__file__).resolve().parent.parent / "alembic"
+
+# Esquema que creaba la antigua migración autogenerada ("Initial tables") = 0001_baseline
+BASELINE_REVISION = "0001_baseline"
+BASELINE_SCHEMA = {
+    "users": {"id", "telegram_id", "username", "first_name", "last_name", "created_at", "updated_at"},
+    "exercises": {"id", "user_id", "day", "description", "created_at"},
+}
+
+
+def adopt_unknown_revision(connection, script) -> str | None:
+    """Restamp a database left at a revision that is not shipped (sync connection).
+
+    Databases created before the migrations were versioned are stamped with a
+    locally autogenerated revision alembic can't locate. If the schema is
+    exactly the baseline, alembic_version is replaced by 0001_baseline so the
+    upgrade continues from there; returns the revision it replaced. Any other
+    unknown revision raises with the command to fix it by hand.
+    """
+    from alembic.runtime.migration import MigrationContext
+
+    shipped = {revision.revision for revision in script.walk_revisions()}
+    current = MigrationContext.configure(connection).get_current_heads()
+    unknown = [revision for revision in current if revision not in shipped]
+    if not unknown:
+        # End the read transaction: alembic only commits transactions it began
+        connection.rollback()
+        return None
+
+    inspector = inspect(connection)
+    schema = {
+        table: {column["name"] for column in inspector.get_columns(table)}
+        for table in inspector.get_table_names() if table != "alembic_version"
+    }
+    if schema != BASELINE_SCHEMA:
+        raise RuntimeError(
+            f"Database is stamped with unknown revision {', '.join(unknown)} and its schema is not "
+            f"{BASELINE_REVISION}: run `alembic stamp --purge <revision it matches>`, then `alembic upgrade head`"
+        )
+
+    connection.execute(text("DELETE FROM alembic_version"))
+    connection.execute(
+        text("INSERT INTO alembic_version (version_num) VALUES (:revision)"),
+        {"revision": BASELINE_REVISION}
+    )
+    connection.commit()
+    return ", ".join(unknown)
+
+
+async def check_migrations() -> str:
+    """Fail unless the database is at the latest shipped migration; returns the revision.
+
+    Only reads alembic_version: nothing is generated or applied at startup.
+    """
+    # Alembic is only needed for this check
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+
+    async with engine.connect() as conn:
+        current = set(await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads()
+        ))
+
+    if current != heads:
+        raise RuntimeError(
+            f"Database is at revision {', '.join(sorted(current)) or 'none'}, "
+            f"expected {', '.join(sorted(heads))}: run `alembic upgrade head`"
+        )
+    return ", ".join(sorted(heads))
@@ -1,4 +1,10 @@
 from app.models.user import User
 from app.models.exercise import Exercise
+from app.models.chat_member import ChatMember
+from app.models.monthly_count import MonthlyExerciseCount
+from app.models.lift import Lift
+from app.models.exercise_set import ExerciseSet
+from app.models.group_digest import GroupDigest
+from app.models.processed_update import ProcessedUpdate
 
-__all__ = ["User", "Exercise"]
+__all__ = ["User", "Exercise", "ChatMember", "MonthlyExerciseCount", "Lift", "ExerciseSet", "GroupDigest", "ProcessedUpdate"]
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class ChatMember(Base):
+    __tablename__ = "chat_members"
+
+    # PK compuesta (chat_id, user_id): sirve de índice para filtrar por grupo
+    chat_id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relación con usuario
+    user = relationship("User", back_populates="chats")
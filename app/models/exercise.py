@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, Date, DateTime, ForeignKey, func, Index
+from sqlalchemy import Column, Integer, Text, Date, DateTime, ForeignKey, func, Index, PrimaryKeyConstraint, DDL, event
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -18,4 +18,67 @@ class Exercise(Base):
     # Índice compuesto para queries eficientes
     __table_args__ = (
         Index('ix_exercises_user_day', 'user_id', 'day'),
+        # Postgres: tabla particionada por mes de day (0009_exercise_partitions). La clave
+        # primaria tiene que incluir day, así que allí es (id, day) y la crea PARTITION_DDL
+        PrimaryKeyConstraint('id').ddl_if(dialect='sqlite'),
+        {'postgresql_partition_by': 'RANGE (day)'},
     )
+
+
+# Para metadata.create_all() en Postgres; las particiones mensuales las crea
+# app.services.partition_service, mientras tanto las filas van a exercises_default
+PARTITION_DDL = [
+    "ALTER TABLE exercises ADD PRIMARY KEY (id, day)",
+    "CREATE TABLE IF NOT EXISTS exercises_default PARTITION OF exercises DEFAULT",
+]
+
+
+# Índice de búsqueda de texto (/search), fuera del modelo porque depende del dialecto.
+# Lo crea la migración 0006_exercise_search; esto lo replica para metadata.create_all().
+# Postgres: columna tsvector generada + GIN (user_id, search_vector) con btree_gin
+SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE exercises ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        # translate() quita tildes como remove_diacritics de FTS5 (unaccent no es inmutable)
+        "GENERATED ALWAYS AS (to_tsvector('simple', translate(description, "
+        "'ÀÁÂÃÄÅÈÉÊËÌÍÎÏÒÓÔÕÖÙÚÛÜÑÇÝàáâãäåèéêëìíîïòóôõöùúûüñçýÿ', "
+        "'AAAAAAEEEEIIIIOOOOOUUUUNCYaaaaaaeeeeiiiiooooouuuuncyy'))) STORED",
+        # Sin btree_gin (contrib) el GIN solo cubre search_vector
+        """
+        DO $$ BEGIN
+            IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gin') THEN
+                CREATE EXTENSION IF NOT EXISTS btree_gin;
+                CREATE INDEX IF NOT EXISTS ix_exercises_search ON exercises USING gin (user_id, search_vector);
+            ELSE
+                CREATE INDEX IF NOT EXISTS ix_exercises_search ON exercises USING gin (search_vector);
+            END IF;
+        END $$
+        """,
+    ],
+    # SQLite: tabla FTS5 de contenido externo sincronizada con triggers
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS exercises_fts USING fts5("
+        "description, content='exercises', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS exercises_fts_ai AFTER INSERT ON exercises BEGIN "
+        "INSERT INTO exercises_fts(rowid, description) VALUES (new.id, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS exercises_fts_ad AFTER DELETE ON exercises BEGIN "
+        "INSERT INTO exercises_fts(exercises_fts, rowid, description) "
+        "VALUES ('delete', old.id, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS exercises_fts_au AFTER UPDATE OF description ON exercises BEGIN "
+        "INSERT INTO exercises_fts(exercises_fts, rowid, description) "
+        "VALUES ('delete', old.id, old.description); "
+        "INSERT INTO exercises_fts(rowid, description) VALUES (new.id, new.description); END",
+    ],
+}
+
+for _statement in PARTITION_DDL:
+    event.listen(Exercise.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _dialect, _statements in SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Exercise.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(
+    Exercise.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS exercises_fts").execute_if(dialect="sqlite")
+)
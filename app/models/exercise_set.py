@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey, ForeignKeyConstraint, Index
+from app.database import Base
+
+
+class ExerciseSet(Base):
+    __tablename__ = "exercise_sets"
+
+    # Series extraídas de Exercise.description al escribir (p.ej. "Bench press 3x10 80kg")
+    id = Column(Integer, primary_key=True, index=True)
+    exercise_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    lift_id = Column(Integer, ForeignKey("lifts.id"), nullable=False)
+    day = Column(Date, nullable=False)  # Copia de Exercise.day para consultar sin join
+    sets = Column(Integer, nullable=True)
+    reps = Column(Integer, nullable=True)
+    weight = Column(Float, nullable=True)  # kg
+    duration_minutes = Column(Float, nullable=True)
+
+    __table_args__ = (
+        # Solo SQLite: en Postgres exercises está particionada y una FK exigiría (exercise_id, day)
+        # e impediría desadjuntar meses archivados, cuyas series siguen sirviendo a /pr y /progress
+        ForeignKeyConstraint(["exercise_id"], ["exercises.id"], ondelete="CASCADE").ddl_if(dialect="sqlite"),
+        # /progress: historial de un ejercicio por fecha
+        Index("ix_exercise_sets_user_lift_day", "user_id", "lift_id", "day"),
+        # /pr: mejor marca por ejercicio
+        Index("ix_exercise_sets_user_lift_weight", "user_id", "lift_id", "weight"),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, BigInteger, Date, DateTime, Text, func
+from app.database import Base
+
+
+class GroupDigest(Base):
+    __tablename__ = "group_digests"
+
+    # Un registro por grupo y periodo: se inserta antes de enviar, así un
+    # reinicio (u otro worker) nunca vuelve a publicar el mismo resumen
+    chat_id = Column(BigInteger, primary_key=True)
+    kind = Column(String(16), primary_key=True)  # weekly | monthly
+    period_start = Column(Date, primary_key=True)
+    status = Column(String(16), nullable=False)  # sending | sent | skipped | failed
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from app.database import Base
+
+
+class Lift(Base):
+    __tablename__ = "lifts"
+
+    # Catálogo de ejercicios: nombre normalizado (sin tildes, minúsculas) como clave
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    display_name = Column(String(100), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from app.database import Base
+
+
+class MonthlyExerciseCount(Base):
+    __tablename__ = "exercise_monthly_counts"
+
+    # Rollup mantenido por add_exercise: un registro por usuario y mes
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)  # Primer día del mes
+    count = Column(Integer, nullable=False, default=0)
+    # Bitset de días entrenados: bit d-1 = al menos un ejercicio el día d del mes
+    days = Column(Integer, nullable=False, default=0, server_default="0")
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, BigInteger, DateTime, func
+from app.database import Base
+
+
+class ProcessedUpdate(Base):
+    __tablename__ = "processed_updates"
+
+    # update_id de Telegram ya recibido: un reenvío del mismo update (webhook
+    # lento, otro worker o un reinicio) se confirma sin volver a procesarlo.
+    # Las filas más antiguas que UPDATE_DEDUP_TTL se borran periódicamente.
+    update_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -16,3 +16,6 @@ class User(Base):
 
     # Relación con ejercicios
     exercises = relationship("Exercise", back_populates="user", cascade="all, delete-orphan")
+
+    # Relación con grupos en los que participa
+    chats = relationship("ChatMember", back_populates="user", cascade="all, delete-orphan")
@@ -1,3 +1,8 @@
-from app.services import user_service, exercise_service
+from app.services import user_service, exercise_service, chat_service, import_service, export_service, workout_service, search_service, digest_service, partition_service
+from app.services.cache_bus import cache_bus
+from app.services.identity_cache import identity_cache
+from app.services.stats_cache import stats_cache
+from app.services.update_dedup import update_dedup
+from app.services.partition_service import partition_maintainer
 
-__all__ = ["user_service", "exercise_service"]
+__all__ = ["user_service", "exercise_service", "chat_service", "import_service", "export_service", "workout_service", "search_service", "digest_service", "partition_service", "identity_cache", "cache_bus", "stats_cache", "update_dedup", "partition_maintainer"]
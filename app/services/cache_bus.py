@@ -0,0 +1,103 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Callable
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Canal de Postgres para invalidaciones entre procesos/réplicas
+CHANNEL = "gymbot_cache"
+RECONNECT_DELAY = 5.0
+
+
+class CacheBus:
+    """Cross-process invalidation of in-memory caches over Postgres LISTEN/NOTIFY.
+
+    Caches register an invalidate(key) and a clear() callback under a name.
+    publish() sends NOTIFY inside the caller's transaction, so other
+    processes only drop their entry once the write is committed. If the
+    listener connection drops, every registered cache is cleared, since
+    notifications sent meanwhile are lost. On SQLite this is a no-op.
+    """
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.received = 0
+        self._handlers: dict[str, tuple[Callable[[Any], None], Callable[[], None]]] = {}
+        self._task: asyncio.Task | None = None
+
+    def register(self, name: str, invalidate: Callable[[Any], None], clear: Callable[[], None]) -> None:
+        self._handlers[name] = (invalidate, clear)
+
+    def notify(self, name: str, key: Any):
+        """pg_notify() expression for an invalidation, to fold into another statement"""
+        payload = json.dumps({"origin": self.origin, "name": name, "key": key}, default=str)
+        return func.pg_notify(CHANNEL, payload)
+
+    async def publish(self, db: AsyncSession, name: str, key: Any) -> None:
+        """Queue an invalidation for other processes, sent when db commits"""
+        if db.bind.dialect.name != "postgresql":
+            return
+        await db.execute(select(self.notify(name, key)))
+
+    async def start(self) -> None:
+        """Start listening for invalidations from other processes"""
+        if engine.dialect.name != "postgresql" or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._listen(), name="cache-bus")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _clear_all(self) -> None:
+        for _, clear in self._handlers.values():
+            clear()
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed cache invalidation: {payload!r}")
+            return
+        if message.get("origin") == self.origin:
+            return  # Already applied locally by the writer
+        handler = self._handlers.get(message.get("name"))
+        if handler is not None:
+            self.received += 1
+            handler[0](message.get("key"))
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(CHANNEL, self._on_notify)
+                # Anything published before we subscribed was missed
+                self._clear_all()
+                logger.info(f"Listening for cache invalidations on '{CHANNEL}'")
+                await lost.wait()
+                logger.warning("Cache invalidation listener disconnected")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener failed: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            self._clear_all()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+cache_bus = CacheBus()
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from app.database import dialect_insert
+from app.models.chat_member import ChatMember
+from app.models.user import User
+from app.services.cache_bus import cache_bus
+from app.services.user_service import resolve_user_id
+
+# Pares (chat_id, telegram_id) ya registrados en este proceso, para no tocar
+# la base de datos en cada mensaje de grupo
+_KNOWN_MEMBERS_MAX = 10_000
+_known_members: OrderedDict[tuple[int, int], None] = OrderedDict()
+
+
+def _remember(chat_id: int, telegram_id: int) -> None:
+    _known_members[(chat_id, telegram_id)] = None
+    _known_members.move_to_end((chat_id, telegram_id))
+    if len(_known_members) > _KNOWN_MEMBERS_MAX:
+        _known_members.popitem(last=False)
+
+
+def _forget(key) -> None:
+    _known_members.pop(tuple(key), None)
+
+
+cache_bus.register("chat_member", _forget, _known_members.clear)
+
+
+def is_known_member(chat_id: int, telegram_id: int) -> bool:
+    """Whether this process already registered the membership (add_member would be a no-op)"""
+    return (chat_id, telegram_id) in _known_members
+
+
+async def add_member(db: AsyncSession, chat_id: int, telegram_id: int) -> bool:
+    """Register a user as member of a group chat. Returns False if the user is not registered"""
+    if (chat_id, telegram_id) in _known_members:
+        _known_members.move_to_end((chat_id, telegram_id))
+        return True
+
+    user_id = await resolve_user_id(db, telegram_id)
+
+    if user_id is None:
+        return False
+
+    await db.execute(
+        dialect_insert(db)(ChatMember)
+        .values(chat_id=chat_id, user_id=user_id)
+        .on_conflict_do_nothing(index_elements=["chat_id", "user_id"])
+    )
+    await db.commit()
+    _remember(chat_id, telegram_id)
+    return True
+
+
+async def remove_member(db: AsyncSession, chat_id: int, telegram_id: int) -> None:
+    """Remove a user from a group chat"""
+    _known_members.pop((chat_id, telegram_id), None)
+
+    await db.execute(
+        delete(ChatMember)
+        .where(ChatMember.chat_id == chat_id)
+        .where(ChatMember.user_id.in_(
+            select(User.id).where(User.telegram_id == telegram_id)
+        ))
+    )
+    await cache_bus.publish(db, "chat_member", [chat_id, telegram_id])
+    await db.commit()
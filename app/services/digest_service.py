@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import select, update, delete, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import dialect_insert
+from app.models.chat_member import ChatMember
+from app.models.group_digest import GroupDigest
+
+DIGEST_KINDS = ("weekly", "monthly")
+
+
+def digest_period(kind: str, today: date) -> tuple[date, date]:
+    """Latest complete period before today: last Monday-Sunday week or last calendar month"""
+    if kind == "weekly":
+        end_date = today - timedelta(days=today.weekday() + 1)
+        return end_date - timedelta(days=6), end_date
+    if kind == "monthly":
+        end_date = today.replace(day=1) - timedelta(days=1)
+        return end_date.replace(day=1), end_date
+    raise ValueError(f"Unknown digest kind: {kind}")
+
+
+async def pending_chats(
+    db: AsyncSession,
+    kind: str,
+    period_start: date,
+    after_chat_id: int | None = None,
+    limit: int = 500
+) -> list[int]:
+    """Groups (by chat_id order) that have no digest of this period yet"""
+    query = (
+        select(ChatMember.chat_id)
+        .distinct()
+        .where(~exists().where(
+            GroupDigest.chat_id == ChatMember.chat_id,
+            GroupDigest.kind == kind,
+            GroupDigest.period_start == period_start
+        ))
+        .order_by(ChatMember.chat_id)
+        .limit(limit)
+    )
+    if after_chat_id is not None:
+        query = query.where(ChatMember.chat_id > after_chat_id)
+    return list((await db.execute(query)).scalars().all())
+
+
+async def claim_digests(db: AsyncSession, kind: str, period_start: date, chat_ids: list[int]) -> list[int]:
+    """Record digests as being sent and return the chats this caller claimed.
+
+    Rows already present (sent before a restart, or claimed by another
+    worker) are left alone, so each digest is posted at most once.
+    """
+    if not chat_ids:
+        return []
+    result = await db.execute(
+        dialect_insert(db)(GroupDigest)
+        .values([
+            {"chat_id": chat_id, "kind": kind, "period_start": period_start, "status": "sending"}
+            for chat_id in chat_ids
+        ])
+        .on_conflict_do_nothing(index_elements=["chat_id", "kind", "period_start"])
+        .returning(GroupDigest.chat_id)
+    )
+    claimed = list(result.scalars().all())
+    await db.commit()
+    return claimed
+
+
+async def finish_digests(
+    db: AsyncSession,
+    kind: str,
+    period_start: date,
+    results: dict[int, tuple[str, str | None]]
+) -> None:
+    """Store the outcome (status, error) of claimed digests.
+
+    Status "retry" drops the claim so the digest is attempted again on the
+    next run (only used when the message was certainly not delivered).
+    """
+    now = datetime.now(timezone.utc)
+    retry = [chat_id for chat_id, (status, _) in results.items() if status == "retry"]
+    done = [
+        {
+            "chat_id": chat_id,
+            "kind": kind,
+            "period_start": period_start,
+            "status": status,
+            "error": error,
+            "sent_at": now if status == "sent" else None
+        }
+        for chat_id, (status, error) in results.items()
+        if status != "retry"
+    ]
+    if done:
+        # Bulk UPDATE by primary key
+        await db.execute(update(GroupDigest), done)
+    if retry:
+        await db.execute(
+            delete(GroupDigest)
+            .where(GroupDigest.kind == kind)
+            .where(GroupDigest.period_start == period_start)
+            .where(GroupDigest.chat_id.in_(retry))
+        )
+    await db.commit()
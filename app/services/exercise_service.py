@@ -1,68 +1,212 @@
-from datetime import date, datetime
+from datetime import date
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, cast, case, literal, delete, distinct, or_, Integer
+from sqlalchemy.dialects.postgresql import BIT
+from app.database import dialect_insert
 from app.models.exercise import Exercise
 from app.models.user import User
+from app.models.chat_member import ChatMember
+from app.models.monthly_count import MonthlyExerciseCount
+from app.services.identity_cache import identity_cache
+from app.services.stats_cache import stats_cache
+from app.services import workout_service
+from app.services.user_service import resolve_user_id, display_name
 
 
-async def add_exercise(
+# Todos los días de un mes en la máscara de días entrenados (bits 0-30)
+ALL_DAYS = (1 << 31) - 1
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _month_expr(db: AsyncSession):
+    """SQL expression truncating Exercise.day to the first day of its month"""
+    if db.bind.dialect.name == "postgresql":
+        return cast(func.date_trunc("month", Exercise.day), Exercise.day.type)
+    return func.date(Exercise.day, "start of month")
+
+
+def _day_of_month_expr(db: AsyncSession):
+    """SQL expression for the day of the month of Exercise.day"""
+    if db.bind.dialect.name == "postgresql":
+        return cast(func.extract("day", Exercise.day), Integer)
+    return cast(func.strftime("%d", Exercise.day), Integer)
+
+
+def day_bit(day: date) -> int:
+    """Bit of day in its month's training-day mask"""
+    return 1 << (day.day - 1)
+
+
+def _range_mask(month: date, start_date: date, end_date: date) -> int:
+    """Mask of the days of month that fall inside [start_date, end_date]"""
+    low = start_date.day if start_date >= month else 1
+    high = end_date.day if _month_start(end_date) == month else 31
+    return ((1 << high) - 1) & ~((1 << (low - 1)) - 1)
+
+
+def _rollup_set(insert) -> dict:
+    """Conflict update adding counts and OR-ing day masks into an existing rollup row"""
+    return {
+        "count": MonthlyExerciseCount.count + insert.excluded.count,
+        "days": MonthlyExerciseCount.days.bitwise_or(insert.excluded.days)
+    }
+
+
+def _monthly_count_upsert(db: AsyncSession, source):
+    """Build the rollup upsert adding each source row (user_id, month, count, days) to its month"""
+    insert = dialect_insert(db)(MonthlyExerciseCount).from_select(
+        ["user_id", "month", "count", "days"], source
+    )
+    return insert.on_conflict_do_update(
+        index_elements=["user_id", "month"],
+        set_=_rollup_set(insert)
+    ).returning(MonthlyExerciseCount.days)
+
+
+async def _increment_monthly_count(db: AsyncSession, user_id: int, day: date) -> int:
+    """Add one to the user's rollup for the month of day and return the days trained that month"""
+    source = select(literal(user_id), literal(_month_start(day)), literal(1), literal(day_bit(day)))
+    result = await db.execute(_monthly_count_upsert(db, source))
+    return result.scalar_one().bit_count()
+
+
+async def add_monthly_counts(
+    db: AsyncSession,
+    increments: dict[tuple[int, date], int],
+    days: dict[tuple[int, date], int] | None = None
+) -> dict[tuple[int, date], int]:
+    """Add per (user_id, month) increments and day masks to the rollups in one statement (no commit).
+
+    Returns the distinct days trained in every touched month.
+    """
+    if not increments:
+        return {}
+
+    days = days or {}
+    insert = dialect_insert(db)(MonthlyExerciseCount).values([
+        {"user_id": user_id, "month": month, "count": count, "days": days.get((user_id, month), 0)}
+        for (user_id, month), count in increments.items()
+    ])
+    result = await db.execute(
+        insert.on_conflict_do_update(
+            index_elements=["user_id", "month"],
+            set_=_rollup_set(insert)
+        ).returning(
+            MonthlyExerciseCount.user_id,
+            MonthlyExerciseCount.month,
+            MonthlyExerciseCount.days
+        )
+    )
+    return {(row.user_id, row.month): row.days.bit_count() for row in result.all()}
+
+
+async def add_exercise_and_count(
     db: AsyncSession,
     telegram_id: int,
     day: date,
     description: str
-) -> Exercise:
-    """Add a new exercise record"""
-    # Get user by telegram_id
-    result = await db.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
+) -> tuple[Exercise, int]:
+    """Add an exercise and return it with the user's distinct training days in its month.
+
+    On PostgreSQL the user lookup, the insert and the rollup upsert run as a
+    single statement (INSERT ... RETURNING chained through CTEs). SQLite
+    cannot nest DML in CTEs, so it runs the same steps as two statements.
+    """
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is not None:
+        user_source = select(literal(user_id).label("id"))
+    else:
+        # Cache miss: resolve the user inside the insert itself
+        user_source = select(User.id).where(User.telegram_id == telegram_id)
+    user_source = user_source.add_columns(literal(day), literal(description))
 
-    if not user:
+    insert = Exercise.__table__.insert().from_select(
+        ["user_id", "day", "description"], user_source
+    ).returning(Exercise.id, Exercise.user_id, Exercise.created_at)
+
+    if db.bind.dialect.name == "postgresql":
+        inserted = insert.cte("inserted")
+        upsert = _monthly_count_upsert(
+            db,
+            select(inserted.c.user_id, literal(_month_start(day)), literal(1), literal(day_bit(day)))
+        ).cte("monthly")
+        query = (
+            select(inserted.c.id, inserted.c.user_id, inserted.c.created_at, upsert.c.days)
+            .select_from(inserted)
+            .join(upsert, literal(True))
+        )
+        # Stats cache invalidation for other processes rides on the same statement
+        notify = stats_cache.notify({telegram_id: [day]})
+        if notify is not None:
+            query = query.add_columns(notify)
+        result = await db.execute(query)
+        row = result.one_or_none()
+        count = row.days.bit_count() if row else None
+    else:
+        result = await db.execute(insert)
+        row = result.one_or_none()
+        count = await _increment_monthly_count(db, row.user_id, day) if row else None
+
+    if row is None:
+        await db.rollback()
         raise ValueError(f"User with telegram_id {telegram_id} not found")
 
+    # Lifts, sets and weights parsed from the description (only if there are any)
+    await workout_service.record_sets(db, [(row.id, row.user_id, day, description)])
+    await db.commit()
+    await stats_cache.invalidate({telegram_id: [day]})
+    identity_cache.set(telegram_id, row.user_id)
+
     exercise = Exercise(
-        user_id=user.id,
+        id=row.id,
+        user_id=row.user_id,
         day=day,
-        description=description
+        description=description,
+        created_at=row.created_at
     )
-    db.add(exercise)
-    await db.commit()
-    await db.refresh(exercise)
-    return exercise
+    return exercise, count
 
 
-async def count_exercises(
-    db: AsyncSession,
-    telegram_id: int | None = None,
-    start_date: date | None = None,
-    end_date: date | None = None
-):
-    """Count exercises by user and date range"""
-    # Build query
-    query = select(
-        User.id,
-        User.telegram_id,
-        User.username,
-        func.count(Exercise.id).label("count")
-    ).join(Exercise, User.id == Exercise.user_id)
-
-    # Apply filters
-    filters = []
-    if telegram_id:
-        filters.append(User.telegram_id == telegram_id)
-    if start_date:
-        filters.append(Exercise.day >= start_date)
-    if end_date:
-        filters.append(Exercise.day <= end_date)
-
-    if filters:
-        query = query.where(and_(*filters))
-
-    query = query.group_by(User.id, User.telegram_id, User.username)
-
-    result = await db.execute(query)
-    return result.all()
+async def rebuild_monthly_counts(db: AsyncSession, user_id: int | None = None, since: date | None = None) -> int:
+    """Recompute monthly rollups from the exercises table. Returns the number of rollup rows
+
+    since (first day of a month) keeps the rollups of earlier months, e.g.
+    months whose partitions were detached from exercises.
+    """
+    clear = delete(MonthlyExerciseCount)
+    if user_id is not None:
+        clear = clear.where(MonthlyExerciseCount.user_id == user_id)
+    if since is not None:
+        clear = clear.where(MonthlyExerciseCount.month >= since)
+    await db.execute(clear)
+
+    month = _month_expr(db)
+    # Distinct powers of two summed = OR of the day bits
+    day_mask = func.sum(distinct(literal(1).bitwise_lshift(_day_of_month_expr(db) - 1)))
+    source = select(
+        Exercise.user_id,
+        month,
+        func.count(Exercise.id),
+        cast(day_mask, Integer)
+    ).group_by(Exercise.user_id, month)
+    if user_id is not None:
+        source = source.where(Exercise.user_id == user_id)
+    if since is not None:
+        source = source.where(Exercise.day >= since)
+
+    result = await db.execute(
+        MonthlyExerciseCount.__table__.insert().from_select(
+            ["user_id", "month", "count", "days"], source
+        )
+    )
+    # Cached stats (closed months are pinned without TTL) were rendered from the old rollups
+    await stats_cache.publish_clear(db)
+    await db.commit()
+    await stats_cache.clear()
+    return result.rowcount
 
 
 async def get_recent_exercises(
@@ -71,33 +215,265 @@ async def get_recent_exercises(
     limit: int = 5
 ) -> list[Exercise]:
     """Get recent exercises for a user"""
-    result = await db.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = result.scalar_one_or_none()
+    user_id = await resolve_user_id(db, telegram_id)
 
-    if not user:
+    if user_id is None:
         return []
 
     result = await db.execute(
         select(Exercise)
-        .where(Exercise.user_id == user.id)
+        .where(Exercise.user_id == user_id)
         .order_by(Exercise.day.desc())
         .limit(limit)
     )
     return list(result.scalars().all())
 
 
-async def get_exercises_by_date_range(
+async def get_exercise_page(
+    db: AsyncSession,
+    telegram_id: int,
+    before: tuple[date, int] | None = None,
+    after: tuple[date, int] | None = None,
+    limit: int = 10
+) -> tuple[list[Exercise], bool, bool]:
+    """Get a page of a user's exercises (newest first) by keyset on (day, id).
+
+    before/after are the (day, id) of the last/first row of the current page.
+    Returns (exercises, has_older, has_newer).
+    """
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        return [], False, False
+
+    query = select(Exercise).where(Exercise.user_id == user_id)
+    if after is not None:
+        day, exercise_id = after
+        # day >= :day keeps the predicate sargable on ix_exercises_user_day
+        query = query.where(
+            Exercise.day >= day,
+            or_(Exercise.day > day, Exercise.id > exercise_id)
+        ).order_by(Exercise.day.asc(), Exercise.id.asc())
+    else:
+        if before is not None:
+            day, exercise_id = before
+            query = query.where(
+                Exercise.day <= day,
+                or_(Exercise.day < day, Exercise.id < exercise_id)
+            )
+        query = query.order_by(Exercise.day.desc(), Exercise.id.desc())
+
+    result = await db.execute(query.limit(limit + 1))
+    exercises = list(result.scalars().all())
+    has_more = len(exercises) > limit
+    exercises = exercises[:limit]
+
+    if after is not None:
+        exercises.reverse()
+        return exercises, True, has_more
+    return exercises, has_more, before is not None
+
+
+def _range_mask_expr(start_date: date, end_date: date):
+    """SQL mask of the days of MonthlyExerciseCount.month inside [start_date, end_date]"""
+    first_month, last_month = _month_start(start_date), _month_start(end_date)
+    return case(
+        (MonthlyExerciseCount.month == first_month, _range_mask(first_month, start_date, end_date)),
+        (MonthlyExerciseCount.month == last_month, _range_mask(last_month, start_date, end_date)),
+        else_=ALL_DAYS
+    )
+
+
+def _popcount_expr(db: AsyncSession, mask):
+    """SQL expression counting the bits set in a day mask"""
+    if db.bind.dialect.name == "postgresql":
+        return func.bit_count(cast(mask, BIT(32)))
+    # SQLite has no popcount: SWAR bit count of a 32-bit value
+    mask = mask - mask.bitwise_rshift(1).bitwise_and(0x55555555)
+    mask = mask.bitwise_and(0x33333333) + mask.bitwise_rshift(2).bitwise_and(0x33333333)
+    mask = (mask + mask.bitwise_rshift(4)).bitwise_and(0x0F0F0F0F)
+    return (mask * 0x01010101).bitwise_and(0xFFFFFFFF).bitwise_rshift(24)
+
+
+def _leaderboard_query(start_date: date, end_date: date):
+    """(id, name, days) rows of every monthly day mask in the range, cut to [start_date, end_date]"""
+    return (
+        select(
+            User.id,
+            display_name().label("name"),
+            MonthlyExerciseCount.days.bitwise_and(_range_mask_expr(start_date, end_date)).label("days")
+        )
+        .join(MonthlyExerciseCount, MonthlyExerciseCount.user_id == User.id)
+        .where(MonthlyExerciseCount.month >= _month_start(start_date))
+        .where(MonthlyExerciseCount.month <= _month_start(end_date))
+        .where(MonthlyExerciseCount.days != 0)
+    )
+
+
+def _training_day_totals(db: AsyncSession, masks, *keys: str):
+    """Subquery of training days per user (and keys) summed from masks; users without days are left out"""
+    masks = masks.subquery()
+    total = cast(func.sum(_popcount_expr(db, masks.c.days)), Integer)
+    columns = [masks.c[key] for key in keys] + [masks.c.id, masks.c.name]
+    return (
+        select(*columns, total.label("total"))
+        .group_by(*columns)
+        .having(total > 0)
+        .subquery()
+    )
+
+
+async def get_leaderboard(
     db: AsyncSession,
     start_date: date,
+    end_date: date,
+    chat_id: int | None = None,
+    limit: int | None = None
+) -> list[tuple[str, int]]:
+    """Get (name, training days) leaderboard for a date range, popcounted, ranked and cut in SQL"""
+    masks = _leaderboard_query(start_date, end_date)
+    if chat_id is not None:
+        # Solo miembros del grupo (usa la PK (chat_id, user_id) de chat_members)
+        masks = masks.join(ChatMember, ChatMember.user_id == User.id).where(
+            ChatMember.chat_id == chat_id
+        )
+    totals = _training_day_totals(db, masks)
+    query = select(totals.c.name, totals.c.total).order_by(totals.c.total.desc(), totals.c.id)
+    if limit:
+        query = query.limit(limit)
+    return [(row.name, row.total) for row in (await db.execute(query)).all()]
+
+
+async def get_group_leaderboards(
+    db: AsyncSession,
+    chat_ids: list[int],
+    start_date: date,
+    end_date: date,
+    limit: int | None = None
+) -> dict[int, list[tuple[str, int]]]:
+    """Leaderboards of many groups at once: one query over the day masks of all their members"""
+    if not chat_ids:
+        return {}
+    masks = (
+        _leaderboard_query(start_date, end_date)
+        .add_columns(ChatMember.chat_id)
+        .join(ChatMember, ChatMember.user_id == User.id)
+        .where(ChatMember.chat_id.in_(chat_ids))
+    )
+    totals = _training_day_totals(db, masks, "chat_id")
+    # Top limit of each group
+    rank = func.row_number().over(
+        partition_by=totals.c.chat_id,
+        order_by=(totals.c.total.desc(), totals.c.id)
+    ).label("rank")
+    ranked = select(totals.c.chat_id, totals.c.name, totals.c.total, rank).subquery()
+    query = select(ranked.c.chat_id, ranked.c.name, ranked.c.total).order_by(ranked.c.chat_id, ranked.c.rank)
+    if limit:
+        query = query.where(ranked.c.rank <= limit)
+
+    leaderboards: dict[int, list[tuple[str, int]]] = {chat_id: [] for chat_id in chat_ids}
+    for row in (await db.execute(query)).all():
+        leaderboards[row.chat_id].append((row.name, row.total))
+    return leaderboards
+
+
+async def _day_masks(db: AsyncSession, user_id: int, start_date: date | None = None, end_date: date | None = None):
+    query = (
+        select(MonthlyExerciseCount.month, MonthlyExerciseCount.days)
+        .where(MonthlyExerciseCount.user_id == user_id)
+        .where(MonthlyExerciseCount.days != 0)
+        .order_by(MonthlyExerciseCount.month)
+    )
+    if start_date is not None:
+        query = query.where(MonthlyExerciseCount.month >= _month_start(start_date))
+    if end_date is not None:
+        query = query.where(MonthlyExerciseCount.month <= _month_start(end_date))
+    return (await db.execute(query)).all()
+
+
+async def count_training_days(
+    db: AsyncSession,
+    telegram_id: int,
+    start_date: date,
     end_date: date
-) -> list[Exercise]:
-    """Get all exercises within a date range (for groups)"""
-    result = await db.execute(
-        select(Exercise)
-        .where(Exercise.day >= start_date)
-        .where(Exercise.day <= end_date)
-        .order_by(Exercise.day.desc())
+) -> int:
+    """Count distinct days with at least one exercise, by popcount of the monthly day masks"""
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        return 0
+
+    return sum(
+        (days & _range_mask(month, start_date, end_date)).bit_count()
+        for month, days in await _day_masks(db, user_id, start_date, end_date)
     )
-    return list(result.scalars().all())
+
+
+async def get_month_totals(db: AsyncSession, telegram_id: int, month: date) -> tuple[int, int]:
+    """Return (training days, exercises logged) in the month of `month`, from its rollup row"""
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        return 0, 0
+
+    row = (await db.execute(
+        select(MonthlyExerciseCount.days, MonthlyExerciseCount.count)
+        .where(MonthlyExerciseCount.user_id == user_id)
+        .where(MonthlyExerciseCount.month == _month_start(month))
+    )).first()
+    if row is None:
+        return 0, 0
+    return row.days.bit_count(), row.count
+
+
+async def get_training_days(
+    db: AsyncSession,
+    telegram_id: int,
+    start_date: date,
+    end_date: date
+) -> set[date]:
+    """Days with at least one exercise in a date range (for calendar views)"""
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        return set()
+
+    trained = set()
+    for month, days in await _day_masks(db, user_id, start_date, end_date):
+        days &= _range_mask(month, start_date, end_date)
+        while days:
+            bit = days & -days
+            trained.add(month.replace(day=bit.bit_length()))
+            days ^= bit
+    return trained
+
+
+async def get_streaks(db: AsyncSession, telegram_id: int, today: date) -> tuple[int, int]:
+    """Return (current, longest) runs of consecutive training days.
+
+    The current streak still counts if the last training day was yesterday.
+    """
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        return 0, 0
+
+    rows = await _day_masks(db, user_id, end_date=today)
+    if not rows:
+        return 0, 0
+
+    # Concatenate the monthly masks into one bitset indexed by days since the first month
+    base = rows[0].month.toordinal()
+    bits = 0
+    for month, days in rows:
+        bits |= days << (month.toordinal() - base)
+
+    longest = 0
+    runs = bits
+    while runs:
+        runs &= runs >> 1
+        longest += 1
+
+    position = today.toordinal() - base
+    if position >= 0 and not bits >> position & 1:
+        position -= 1
+    current = 0
+    while position >= 0 and bits >> position & 1:
+        current += 1
+        position -= 1
+    return current, longest
\ No newline at end of file
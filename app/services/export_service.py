@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.chat_member import ChatMember
+from app.models.exercise import Exercise
+from app.models.user import User
+from app.services.user_service import resolve_user_id, display_name
+
+EXPORT_FORMATS = ("csv", "json")
+
+
+def _export_query(user_id: int | None, chat_id: int | None):
+    if chat_id is not None:
+        return (
+            select(display_name().label("user"), Exercise.day, Exercise.description)
+            .join(User, User.id == Exercise.user_id)
+            .join(ChatMember, ChatMember.user_id == Exercise.user_id)
+            .where(ChatMember.chat_id == chat_id)
+            .order_by(Exercise.day, Exercise.id)
+        )
+    return (
+        select(Exercise.day, Exercise.description)
+        .where(Exercise.user_id == user_id)
+        .order_by(Exercise.day, Exercise.id)
+    )
+
+
+def _encode(fmt: str, columns: list[str], rows, header: bool) -> bytes:
+    """Encode a batch of rows as CSV (optionally with header) or JSON Lines"""
+    if fmt == "json":
+        return "".join(
+            json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_export(
+    db: AsyncSession,
+    telegram_id: int | None = None,
+    chat_id: int | None = None,
+    batch_size: int = 1000
+) -> AsyncIterator[list]:
+    """Yield batches of exercise rows for a user or group through a server-side cursor"""
+    user_id = None
+    if chat_id is None:
+        user_id = await resolve_user_id(db, telegram_id)
+        if user_id is None:
+            raise ValueError(f"User with telegram_id {telegram_id} not found")
+
+    result = await db.stream(
+        _export_query(user_id, chat_id).execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+async def export_bytes(
+    db: AsyncSession,
+    fmt: str,
+    telegram_id: int | None = None,
+    chat_id: int | None = None,
+    batch_size: int = 1000
+) -> AsyncIterator[bytes]:
+    """Stream an export as encoded chunks (one per cursor batch)"""
+    columns = ["user", "day", "description"] if chat_id is not None else ["day", "description"]
+    header = True
+    async for rows in stream_export(db, telegram_id, chat_id, batch_size):
+        yield _encode(fmt, columns, rows, header)
+        header = False
+
+    if header and fmt == "csv":
+        # Empty export: still send the header
+        yield _encode(fmt, columns, [], True)
+
+
+async def export_files(
+    db: AsyncSession,
+    fmt: str,
+    telegram_id: int | None = None,
+    chat_id: int | None = None,
+    batch_size: int = 1000,
+    max_rows: int = 50000
+) -> AsyncIterator[bytes]:
+    """Yield the export split into files of at most max_rows rows each"""
+    columns = ["user", "day", "description"] if chat_id is not None else ["day", "description"]
+    part = io.BytesIO()
+    part_rows = 0
+
+    async for rows in stream_export(db, telegram_id, chat_id, batch_size):
+        while rows:
+            take = rows[:max_rows - part_rows]
+            rows = rows[len(take):]
+            part.write(_encode(fmt, columns, take, header=part_rows == 0))
+            part_rows += len(take)
+            if part_rows >= max_rows:
+                yield part.getvalue()
+                part = io.BytesIO()
+                part_rows = 0
+
+    if part_rows:
+        yield part.getvalue()
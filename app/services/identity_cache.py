@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from app.config import get_settings
+from app.metrics import IDENTITY_CACHE_HITS, IDENTITY_CACHE_MISSES
+
+
+class IdentityCache:
+    """Bounded LRU cache of telegram_id -> user_id with a TTL per entry"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[int, float]] = OrderedDict()
+
+    def get(self, telegram_id: int) -> int | None:
+        """Return the cached user_id, or None on a miss or expired entry"""
+        entry = self._entries.get(telegram_id)
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                del self._entries[telegram_id]
+            self.misses += 1
+            IDENTITY_CACHE_MISSES.inc()
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        IDENTITY_CACHE_HITS.inc()
+        return entry[0]
+
+    def set(self, telegram_id: int, user_id: int) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[telegram_id] = (user_id, time.monotonic() + self.ttl)
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._entries.pop(telegram_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+_settings = get_settings()
+
+identity_cache = IdentityCache(
+    maxsize=_settings.IDENTITY_CACHE_SIZE,
+    ttl=_settings.IDENTITY_CACHE_TTL
+)
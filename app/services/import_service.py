@@ -0,0 +1,235 @@
+import codecs
+import csv
+import json
+from collections import deque
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import AsyncIterator
+from sqlalchemy import insert, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.bot.utils import parse_date
+from app.models.exercise import Exercise
+from app.services import exercise_service, workout_service
+from app.services.stats_cache import stats_cache
+from app.services.user_service import resolve_user_id
+
+# Máximo de errores detallados que se devuelven en el resultado
+MAX_REPORTED_ERRORS = 10
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    rejected: int = 0
+    errors: list[str] = field(default_factory=list)
+    # Archivo ilegible a partir de cierto punto: lo anterior ya quedó guardado
+    error: str | None = None
+
+    def reject(self, record: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Registro {record}: {reason}")
+
+
+async def _iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Yield lines with their line ending (csv.reader keeps newlines inside quoted fields)"""
+    buffer = ""
+    async for text in _iter_text(chunks):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    if buffer:
+        yield buffer
+
+
+class _LineFeed(deque):
+    """Lines waiting for csv.reader; unlike a generator it can be refilled after running dry"""
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self:
+            raise StopIteration
+        return self.popleft()
+
+
+async def _iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[str]]:
+    """Parse the decoded stream with a single csv.reader (quoted fields may span lines)"""
+    lines = _LineFeed()
+    reader = csv.reader(lines, strict=True)
+    quotes = 0
+    try:
+        async for line in _iter_lines(chunks):
+            lines.append(line)
+            quotes += line.count('"')
+            # Odd number of quotes: a quoted field continues on the next line
+            if quotes % 2:
+                continue
+            quotes = 0
+            while lines:
+                yield next(reader)
+        for row in reader:
+            yield row
+    except csv.Error as e:
+        raise ValueError(f"CSV inválido en la línea {reader.line_num}: {e}")
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[str, str]]:
+    """Yield (day, description) from a CSV stream with a header row"""
+    columns = None
+    async for row in _iter_csv_rows(chunks):
+        if not any(value.strip() for value in row):
+            continue
+        if columns is None:
+            columns = [name.strip().lower() for name in row]
+            if "day" not in columns or "description" not in columns:
+                raise ValueError("El CSV debe tener las columnas 'day' y 'description'")
+            continue
+        values = dict(zip(columns, row))
+        yield values.get("day", ""), values.get("description", "")
+
+
+async def iter_json_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[str, str]]:
+    """Yield (day, description) from a JSON array or JSON Lines stream of objects.
+
+    Objects are decoded one at a time, so only the current object is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    async for text in _iter_text(chunks):
+        buffer += text
+        position = 0
+        while True:
+            # Skip separators between objects: whitespace, '[', ',' and ']'
+            while position < len(buffer) and buffer[position] in " \t\r\n[],":
+                position += 1
+            if position >= len(buffer):
+                break
+            try:
+                obj, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break  # Incomplete object, wait for more data
+            if isinstance(obj, dict):
+                yield str(obj.get("day", "")), str(obj.get("description", ""))
+            else:
+                yield "", ""
+        buffer = buffer[position:]
+
+    if buffer.strip(" \t\r\n[],"):
+        raise ValueError("JSON inválido o incompleto al final del archivo")
+
+
+async def _load_chunk(
+    db: AsyncSession,
+    telegram_id: int,
+    user_id: int,
+    rows: list[tuple[int, date, str]],
+    last_id: int
+) -> int:
+    """Insert one chunk of rows, its rollup increments and parsed sets in a single transaction.
+
+    Ids are not returned by COPY: the user's rows with id > last_id are parsed
+    after loading them. Returns the last_id for the next chunk.
+    """
+    if db.bind.dialect.name == "postgresql":
+        # COPY through the session's own asyncpg connection (same transaction)
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Exercise.__tablename__,
+            records=rows,
+            columns=["user_id", "day", "description"]
+        )
+    else:
+        await db.execute(
+            insert(Exercise),
+            [{"user_id": u, "day": d, "description": desc} for u, d, desc in rows]
+        )
+
+    increments = Counter((user_id, day.replace(day=1)) for _, day, _ in rows)
+    day_masks = defaultdict(int)
+    for _, day, _ in rows:
+        day_masks[(user_id, day.replace(day=1))] |= exercise_service.day_bit(day)
+    await exercise_service.add_monthly_counts(db, increments, day_masks)
+    last_id = await workout_service.record_new_sets(db, user_id, after_id=last_id)
+    written = {telegram_id: [day for _, day, _ in rows]}
+    await stats_cache.publish(db, written)
+    await db.commit()
+    await stats_cache.invalidate(written)
+    return last_id
+
+
+async def import_exercises(
+    db: AsyncSession,
+    telegram_id: int,
+    records: AsyncIterator[tuple[str, str]],
+    chunk_size: int = 1000
+) -> ImportResult:
+    """Validate and bulk-load exercise records in chunked transactions.
+
+    Chunks are committed as the stream is read. If the stream turns out to
+    be malformed (e.g. a truncated JSON body), the valid records before that
+    point are still loaded and the parse error is returned in result.error
+    along with the counts, so a client knows what was already saved.
+    """
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        raise ValueError(f"User with telegram_id {telegram_id} not found")
+
+    last_id = await db.scalar(
+        select(func.max(Exercise.id)).where(Exercise.user_id == user_id)
+    ) or 0
+
+    result = ImportResult()
+    today = date.today()
+    chunk: list[tuple[int, date, str]] = []
+    record_number = 0
+
+    rows = aiter(records)
+    while True:
+        try:
+            day_str, description = await anext(rows)
+        except StopAsyncIteration:
+            break
+        except ValueError as e:
+            result.error = f"{e} (después del registro {record_number})"
+            break
+        record_number += 1
+        day = parse_date(day_str.strip())
+        description = description.strip()
+
+        if not day:
+            result.reject(record_number, f"fecha inválida '{day_str}'")
+            continue
+        if day > today:
+            result.reject(record_number, f"fecha futura {day}")
+            continue
+        if not description:
+            result.reject(record_number, "descripción vacía")
+            continue
+
+        chunk.append((user_id, day, description))
+        if len(chunk) >= chunk_size:
+            last_id = await _load_chunk(db, telegram_id, user_id, chunk, last_id)
+            result.inserted += len(chunk)
+            chunk = []
+
+    if chunk:
+        await _load_chunk(db, telegram_id, user_id, chunk, last_id)
+        result.inserted += len(chunk)
+
+    return result
@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.config import get_settings
+from app.database import engine, try_advisory_lock
+from app.metrics import PARTITIONS_ARCHIVED, PARTITIONS_CREATED
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock de Postgres: un solo proceso mantiene las particiones a la vez
+PARTITION_LOCK_ID = 0x67796D707274  # "gymprt"
+
+# Segundos entre revisiones de particiones
+MAINTENANCE_INTERVAL = 6 * 3600.0
+
+# Sin esperar detrás de consultas largas: la revisión siguiente lo reintenta
+LOCK_TIMEOUT = "5s"
+
+ARCHIVE_MODES = ("move", "detach")
+
+DEFAULT_PARTITION = "exercises_default"
+COLUMNS = "id, user_id, day, description, created_at"
+
+# Mismo formato que 0009_exercise_partitions: exercises_y2024m01
+PARTITION_NAME = re.compile(r"^exercises_y(\d{4})m(\d{2})$")
+IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+@dataclass
+class Partition:
+    schema: str
+    name: str
+    month: date
+    attached: bool
+
+
+def partition_name(month: date) -> str:
+    return f"exercises_y{month.year}m{month.month:02d}"
+
+
+async def is_partitioned(conn: AsyncConnection | AsyncSession) -> bool:
+    """Whether exercises is a partitioned table (Postgres after 0009_exercise_partitions)"""
+    return bool(await conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('exercises'))"
+    )))
+
+
+async def list_partitions(conn: AsyncConnection | AsyncSession, archive_schema: str) -> list[Partition]:
+    """Monthly partitions of exercises, plus months detached into archive_schema, oldest first"""
+    rows = await conn.execute(text("""
+        SELECT n.nspname AS schema, c.relname AS name, true AS attached
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE i.inhparent = to_regclass('exercises')
+        UNION ALL
+        SELECT n.nspname, c.relname, false
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = :archive_schema AND c.relkind = 'r' AND NOT c.relispartition
+    """), {"archive_schema": archive_schema})
+    partitions = []
+    for row in rows:
+        match = PARTITION_NAME.match(row.name)
+        if match:
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append(Partition(row.schema, row.name, month, row.attached))
+    return sorted(partitions, key=lambda partition: partition.month)
+
+
+async def detached_until(db: AsyncSession, archive_schema: str) -> date | None:
+    """First day after the newest month detached from exercises, or None.
+
+    Rows of detached months are no longer in exercises, but their monthly
+    rollups still count them.
+    """
+    if db.bind.dialect.name != "postgresql" or not await is_partitioned(db):
+        return None
+    detached = [partition.month for partition in await list_partitions(db, archive_schema) if not partition.attached]
+    return max(detached) + relativedelta(months=1) if detached else None
+
+
+class PartitionMaintainer:
+    """Keeps the monthly partitions of exercises ahead of time and archives cold months.
+
+    Each run creates the partitions of the current month and the next
+    months_ahead months, moves rows that landed in the default partition
+    into a partition of their own month, and archives months that closed
+    more than archive_after months ago: with mode="move" they are moved to
+    archive_schema (and archive_tablespace) but stay attached, so every
+    query still sees them; with mode="detach" they also leave exercises,
+    and only the monthly rollups (/stats, /streak, /calendar, leaderboards)
+    and the parsed sets (/pr, /progress) still cover them; rows written
+    later into a detached month are moved into its archived table. Each change is
+    its own short transaction and gives up after LOCK_TIMEOUT instead of
+    queueing behind long reads.
+    """
+
+    def __init__(
+        self,
+        months_ahead: int = 3,
+        archive_after: int = 0,
+        mode: str = "move",
+        archive_schema: str = "archive",
+        archive_tablespace: str | None = None,
+        interval: float = MAINTENANCE_INTERVAL
+    ):
+        if mode not in ARCHIVE_MODES:
+            raise ValueError(f"Unknown archive mode: {mode}")
+        for identifier in filter(None, (archive_schema, archive_tablespace)):
+            if not IDENTIFIER.match(identifier):
+                raise ValueError(f"Invalid schema or tablespace name: {identifier}")
+        self.months_ahead = max(0, months_ahead)
+        self.archive_after = max(0, archive_after)
+        self.mode = mode
+        self.archive_schema = archive_schema
+        self.archive_tablespace = archive_tablespace
+        self.interval = interval
+        self.created = 0
+        self.archived = 0
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Maintain partitions periodically in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="partition-maintenance")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run(self, today: date | None = None) -> dict[str, list[str]]:
+        """Create upcoming partitions and archive old ones; returns the partitions changed"""
+        if engine.dialect.name != "postgresql":
+            return {}
+        current = (today or date.today()).replace(day=1)
+
+        # Other workers skip this round instead of waiting
+        async with try_advisory_lock(PARTITION_LOCK_ID) as conn:
+            if conn is None or not await is_partitioned(conn):
+                return {}
+            changes = {
+                "created": await self._create_upcoming(conn, current),
+                "archived": await self._archive(conn, current) if self.archive_after else [],
+            }
+
+        self.created += len(changes["created"])
+        self.archived += len(changes["archived"])
+        PARTITIONS_CREATED.inc(len(changes["created"]))
+        PARTITIONS_ARCHIVED.inc(len(changes["archived"]))
+        for action, names in changes.items():
+            if names:
+                logger.info(f"Partitions {action}: {', '.join(names)}")
+        return changes
+
+    async def _create_upcoming(self, conn: AsyncConnection, current: date) -> list[str]:
+        partitions = await list_partitions(conn, self.archive_schema)
+        attached = {partition.month for partition in partitions if partition.attached}
+        detached = {partition.month: partition for partition in partitions if not partition.attached}
+        months = {current + relativedelta(months=offset) for offset in range(self.months_ahead + 1)}
+        # Days without a partition (e.g. /add_past far back) go to the default one
+        months.update(await conn.scalars(text(
+            f"SELECT DISTINCT date_trunc('month', day)::date FROM {DEFAULT_PARTITION}"
+        )))
+        await conn.commit()
+
+        created = []
+        for month in sorted(months - attached):
+            if month in detached:
+                # A write into an archived month: its rows join the detached table
+                await self._move_to_detached(conn, detached[month])
+                continue
+            try:
+                await self._create(conn, month)
+                await conn.commit()
+                created.append(partition_name(month))
+            except Exception as e:
+                await conn.rollback()
+                logger.warning(f"Could not create partition {partition_name(month)}: {e}")
+        return created
+
+    async def _create(self, conn: AsyncConnection, month: date) -> None:
+        name = partition_name(month)
+        end = month + relativedelta(months=1)
+        bounds = f"FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+        in_range = f"day >= '{month.isoformat()}' AND day < '{end.isoformat()}'"
+        await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+
+        if not await conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})")):
+            await conn.execute(text(f"CREATE TABLE {name} PARTITION OF exercises FOR VALUES {bounds}"))
+            return
+
+        # The new range can't be attached while the default partition holds rows in it
+        await conn.execute(text(
+            f"CREATE TABLE {name} (LIKE exercises INCLUDING DEFAULTS INCLUDING GENERATED)"
+        ))
+        await conn.execute(text(
+            f"INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM {DEFAULT_PARTITION} WHERE {in_range}"
+        ))
+        await conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+        await conn.execute(text(f"ALTER TABLE exercises ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+    async def _move_to_detached(self, conn: AsyncConnection, partition: Partition) -> None:
+        end = partition.month + relativedelta(months=1)
+        in_range = f"day >= '{partition.month.isoformat()}' AND day < '{end.isoformat()}'"
+        try:
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            moved = await conn.execute(text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING {COLUMNS}) "
+                f"INSERT INTO {partition.schema}.{partition.name} ({COLUMNS}) SELECT {COLUMNS} FROM moved"
+            ))
+            await conn.commit()
+            logger.info(f"Moved {moved.rowcount} rows into detached partition {partition.schema}.{partition.name}")
+        except Exception as e:
+            await conn.rollback()
+            logger.warning(f"Could not move rows into detached partition {partition.name}: {e}")
+
+    async def _archive(self, conn: AsyncConnection, current: date) -> list[str]:
+        # Months that closed more than archive_after months ago
+        cutoff = current - relativedelta(months=self.archive_after)
+        partitions = [
+            partition for partition in await list_partitions(conn, self.archive_schema)
+            if partition.attached and partition.month < cutoff
+            and (partition.schema != self.archive_schema or self.mode == "detach")
+        ]
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {self.archive_schema}"))
+        await conn.commit()
+
+        archived = []
+        for partition in partitions:
+            try:
+                await self._archive_partition(conn, partition)
+                await conn.commit()
+                archived.append(partition.name)
+            except Exception as e:
+                await conn.rollback()
+                logger.warning(f"Could not archive partition {partition.name}: {e}")
+        return archived
+
+    async def _archive_partition(self, conn: AsyncConnection, partition: Partition) -> None:
+        table = f"{partition.schema}.{partition.name}"
+        await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        if self.mode == "detach":
+            await conn.execute(text(f"ALTER TABLE exercises DETACH PARTITION {table}"))
+        if partition.schema != self.archive_schema:
+            await conn.execute(text(f"ALTER TABLE {table} SET SCHEMA {self.archive_schema}"))
+            table = f"{self.archive_schema}.{partition.name}"
+            if self.archive_tablespace:
+                # Rewrites the month (and its indexes) on the archive storage
+                await conn.execute(text(f"ALTER TABLE {table} SET TABLESPACE {self.archive_tablespace}"))
+                indexes = await conn.scalars(text(
+                    "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = CAST(:table AS regclass)"
+                ), {"table": table})
+                for index in indexes.all():
+                    await conn.execute(text(f"ALTER INDEX {index} SET TABLESPACE {self.archive_tablespace}"))
+
+
+def partition_maintainer_from_settings(settings) -> PartitionMaintainer:
+    return PartitionMaintainer(
+        months_ahead=settings.PARTITION_MONTHS_AHEAD,
+        archive_after=settings.PARTITION_ARCHIVE_AFTER_MONTHS,
+        mode=settings.PARTITION_ARCHIVE_MODE,
+        archive_schema=settings.PARTITION_ARCHIVE_SCHEMA,
+        archive_tablespace=settings.PARTITION_ARCHIVE_TABLESPACE
+    )
+
+
+_settings = get_settings()
+
+# PARTITION_MAINTENANCE=cron runs it with `python -m app.manage partitions` instead
+partition_maintainer = partition_maintainer_from_settings(
+    _settings
+) if _settings.PARTITION_MAINTENANCE == "app" else None
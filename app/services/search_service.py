@@ -0,0 +1,94 @@
+import re
+import unicodedata
+from sqlalchemy import select, and_, or_, func, literal_column, table, column, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.chat_member import ChatMember
+from app.models.exercise import Exercise
+from app.models.user import User
+from app.services.user_service import resolve_user_id, display_name
+
+# Términos como máximo por búsqueda (el resto se ignora)
+MAX_TERMS = 8
+
+_TERM = re.compile(r"[^\W_]+")
+
+# Tabla FTS5 (solo SQLite), creada por la migración 0006_exercise_search
+_fts = table("exercises_fts", column("rowid"))
+
+Cursor = tuple[float, int]  # (rank, exercise_id) de la última fila de la página
+
+
+def search_terms(query: str) -> list[str]:
+    """Words of a search query, lowercased, without accents and deduplicated"""
+    query = unicodedata.normalize("NFKD", query.lower())
+    query = "".join(char for char in query if not unicodedata.combining(char))
+    return list(dict.fromkeys(_TERM.findall(query)))[:MAX_TERMS]
+
+
+def _match(dialect: str, terms: list[str]):
+    """(filter, rank) for the dialect's index; every term is matched as a prefix"""
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        vector = literal_column("exercises.search_vector")
+        return vector.op("@@")(tsquery), func.ts_rank(vector, tsquery, type_=Float)
+
+    # SQLite FTS5: bm25() is lower for better matches, negate it to sort like ts_rank
+    fts = literal_column("exercises_fts")
+    match = fts.op("MATCH")(" AND ".join(f'"{term}"*' for term in terms))
+    return match, -func.bm25(fts, type_=Float)
+
+
+async def search_exercises(
+    db: AsyncSession,
+    query: str,
+    telegram_id: int | None = None,
+    chat_id: int | None = None,
+    after: Cursor | None = None,
+    limit: int = 10
+) -> tuple[list, bool]:
+    """Full-text search over a user's (or group's) exercises, best match first.
+
+    Every term must appear, as a word or word prefix. Pages are keyset on
+    (rank, id): pass the cursor of the last row to get the next page.
+    Rows have id, day, description, rank and, for groups, user.
+    Returns (rows, has_more).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+
+    columns = [Exercise.id, Exercise.day, Exercise.description]
+    if chat_id is not None:
+        columns.insert(0, display_name().label("user"))
+
+    dialect = db.bind.dialect.name
+    match, rank = _match(dialect, terms)
+    statement = select(*columns, rank.label("rank")).select_from(Exercise).where(match)
+    if dialect != "postgresql":
+        statement = statement.join(_fts, _fts.c.rowid == Exercise.id)
+
+    if chat_id is not None:
+        statement = (
+            statement
+            .join(User, User.id == Exercise.user_id)
+            .join(ChatMember, ChatMember.user_id == Exercise.user_id)
+            .where(ChatMember.chat_id == chat_id)
+        )
+    else:
+        user_id = await resolve_user_id(db, telegram_id)
+        if user_id is None:
+            return [], False
+        statement = statement.where(Exercise.user_id == user_id)
+
+    if after is not None:
+        after_rank, after_id = after
+        statement = statement.where(or_(
+            rank < after_rank,
+            and_(rank == after_rank, Exercise.id < after_id)
+        ))
+
+    result = await db.execute(
+        statement.order_by(rank.desc(), Exercise.id.desc()).limit(limit + 1)
+    )
+    rows = list(result.all())
+    return rows[:limit], len(rows) > limit
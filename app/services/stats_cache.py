@@ -0,0 +1,346 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Awaitable, Callable, Iterable
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.database import replica_router
+from app.metrics import STATS_CACHE_HITS, STATS_CACHE_MISSES
+from app.services.cache_bus import cache_bus
+
+logger = logging.getLogger(__name__)
+
+# Más intervalos que esto se invalidan como un único rango (min, max)
+MAX_INTERVALS = 50
+# Límite de payload de NOTIFY en Postgres (8000 bytes) con margen
+MAX_NOTIFY_PAYLOAD = 7000
+
+Interval = tuple[date, date]
+
+
+def user_scope(telegram_id: int) -> str:
+    return f"user:{telegram_id}"
+
+
+def _scope_user(scope: str) -> int:
+    return int(scope.split(":", 1)[1])
+
+
+def _intervals(days: Iterable[date]) -> list[Interval]:
+    """Collapse written days into sorted runs of consecutive days"""
+    intervals: list[Interval] = []
+    for day in sorted(set(days)):
+        if intervals and (day - intervals[-1][1]).days <= 1:
+            intervals[-1] = (intervals[-1][0], day)
+        else:
+            intervals.append((day, day))
+    if len(intervals) > MAX_INTERVALS:
+        return [(intervals[0][0], intervals[-1][1])]
+    return intervals
+
+
+def _overlaps(start: date, end: date, intervals: list[Interval]) -> bool:
+    return any(low <= end and high >= start for low, high in intervals)
+
+
+class MemoryStatsBackend:
+    """In-process LRU of rendered stats.
+
+    Regular entries expire after ttl; pinned entries (closed months) live in
+    their own LRU without expiry, so hot current-month entries can't evict them.
+    """
+
+    shared = False
+
+    def __init__(self, maxsize: int, pinned_maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.pinned_maxsize = pinned_maxsize
+        self.ttl = ttl
+        self._generation = 0
+        self._entries: OrderedDict[tuple[str, date, date], tuple[str, float]] = OrderedDict()
+        self._pinned: OrderedDict[tuple[str, date, date], str] = OrderedDict()
+        # scope -> cached (start, end) ranges, for invalidation by day
+        self._ranges: dict[str, set[Interval]] = {}
+
+    async def get(self, scope: str, start: date, end: date) -> str | None:
+        key = (scope, start, end)
+        text = self._pinned.get(key)
+        if text is not None:
+            self._pinned.move_to_end(key)
+            return text
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            self._drop(self._entries, key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def generation(self) -> int:
+        return self._generation
+
+    async def set(self, scope: str, start: date, end: date, text: str, pinned: bool, generation: int) -> None:
+        if generation != self._generation:
+            return  # A write landed while rendering; the result may be stale
+        key = (scope, start, end)
+        if pinned:
+            store, limit = self._pinned, self.pinned_maxsize
+            store[key] = text
+        else:
+            store, limit = self._entries, self.maxsize
+            store[key] = (text, time.monotonic() + self.ttl)
+        store.move_to_end(key)
+        self._ranges.setdefault(scope, set()).add((start, end))
+        while len(store) > limit:
+            self._drop(store, next(iter(store)))
+
+    async def invalidate(self, scope: str, intervals: list[Interval]) -> None:
+        self.discard(scope, intervals)
+
+    def discard(self, scope: str, intervals: list[Interval]) -> None:
+        """Drop every cached range of scope that contains a written day"""
+        self._generation += 1
+        for start, end in list(self._ranges.get(scope, ())):
+            if _overlaps(start, end, intervals):
+                key = (scope, start, end)
+                self._drop(self._pinned, key)
+                self._drop(self._entries, key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._pinned.clear()
+        self._ranges.clear()
+
+    async def clear_all(self) -> None:
+        self.clear()
+
+    def _drop(self, store: OrderedDict, key: tuple[str, date, date]) -> None:
+        if store.pop(key, None) is None:
+            return
+        scope, start, end = key
+        if key in self._entries or key in self._pinned:
+            return
+        ranges = self._ranges.get(scope)
+        if ranges is not None:
+            ranges.discard((start, end))
+            if not ranges:
+                del self._ranges[scope]
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisStatsBackend:
+    """Stats cache shared by every process through a Redis-compatible server.
+
+    Regular entries get a TTL and pinned ones don't, so with
+    maxmemory-policy volatile-lru the server evicts only unpinned entries.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, ttl: float, prefix: str = "gymbot:stats"):
+        from redis import asyncio as redis
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    def _key(self, scope: str, start: date, end: date) -> str:
+        return f"{self.prefix}:{scope}:{start}:{end}"
+
+    def _index(self, scope: str) -> str:
+        return f"{self.prefix}:{scope}"
+
+    async def get(self, scope: str, start: date, end: date) -> str | None:
+        return await self._redis.get(self._key(scope, start, end))
+
+    async def generation(self) -> int:
+        return int(await self._redis.get(f"{self.prefix}:generation") or 0)
+
+    async def set(self, scope: str, start: date, end: date, text: str, pinned: bool, generation: int) -> None:
+        if generation != await self.generation():
+            return
+        async with self._redis.pipeline(transaction=True) as pipe:
+            # px: STATS_CACHE_TTL is fractional seconds (ex=0 would be rejected)
+            ttl_ms = None if pinned else max(1, int(self.ttl * 1000))
+            pipe.set(self._key(scope, start, end), text, px=ttl_ms)
+            pipe.sadd(self._index(scope), f"{start}:{end}")
+            await pipe.execute()
+
+    async def invalidate(self, scope: str, intervals: list[Interval]) -> None:
+        stale = []
+        for member in await self._redis.smembers(self._index(scope)):
+            start, end = (date.fromisoformat(value) for value in member.split(":"))
+            if _overlaps(start, end, intervals):
+                stale.append((member, self._key(scope, start, end)))
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incr(f"{self.prefix}:generation")
+            if stale:
+                pipe.delete(*(key for _, key in stale))
+                pipe.srem(self._index(scope), *(member for member, _ in stale))
+            await pipe.execute()
+
+    def clear(self) -> None:
+        pass
+
+    async def clear_all(self) -> None:
+        """Drop every entry, pinned ones included"""
+        # Renders in flight when this runs won't store their (stale) result
+        await self._redis.incr(f"{self.prefix}:generation")
+        async for key in self._redis.scan_iter(match=f"{self.prefix}:*", count=1000):
+            if key != f"{self.prefix}:generation":
+                await self._redis.unlink(key)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class StatsCache:
+    """Cache of rendered stats messages keyed by (scope, start_date, end_date).
+
+    Writers call publish() before committing and invalidate() after, with the
+    days they wrote; only cached ranges containing one of those days are
+    dropped. Results for ranges that ended before the current month are
+    pinned. Backend errors fall back to rendering without the cache.
+
+    With a read replica, the same announcements (local and from other
+    processes) keep the writers' reads on the primary (read-your-writes).
+    """
+
+    def __init__(self, backend: MemoryStatsBackend | RedisStatsBackend | None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        if self._local_backend() or replica_router:
+            cache_bus.register("stats", self._on_remote_invalidation, self._clear_local)
+
+    def _local_backend(self) -> bool:
+        return self.backend is not None and not self.backend.shared
+
+    async def get_or_render(
+        self,
+        scope: str,
+        start: date,
+        end: date,
+        render: Callable[[], Awaitable[str]]
+    ) -> str:
+        """Return the cached message for the range, rendering and storing it on a miss"""
+        if self.backend is None:
+            return await render()
+
+        try:
+            text = await self.backend.get(scope, start, end)
+            generation = await self.backend.generation()
+        except Exception as e:
+            logger.warning(f"Stats cache unavailable: {e}")
+            return await render()
+
+        if text is not None:
+            self.hits += 1
+            STATS_CACHE_HITS.inc()
+            return text
+
+        self.misses += 1
+        STATS_CACHE_MISSES.inc()
+        text = await render()
+        pinned = end < date.today().replace(day=1)
+        try:
+            await self.backend.set(scope, start, end, text, pinned, generation)
+        except Exception as e:
+            logger.warning(f"Could not store stats in cache: {e}")
+        return text
+
+    def notify(self, writes: dict[int, Iterable[date]]):
+        """pg_notify() expression announcing written days, or None if not needed"""
+        if not self._local_backend() and not replica_router:
+            return None
+        payload = [
+            [user_scope(telegram_id), [[str(low), str(high)] for low, high in _intervals(days)]]
+            for telegram_id, days in writes.items()
+        ]
+        if len(json.dumps(payload)) > MAX_NOTIFY_PAYLOAD:
+            payload = None  # Too many users in one write: receivers clear everything
+        return cache_bus.notify("stats", payload)
+
+    async def publish(self, db: AsyncSession, writes: dict[int, Iterable[date]]) -> None:
+        """Notify other processes of written days, delivered when db commits"""
+        if db.bind.dialect.name != "postgresql":
+            return
+        notify = self.notify(writes)
+        if notify is not None:
+            await db.execute(select(notify))
+
+    async def invalidate(self, writes: dict[int, Iterable[date]]) -> None:
+        """Drop cached ranges containing the written days (call after commit)"""
+        if replica_router:
+            replica_router.wrote(writes)
+        if self.backend is None:
+            return
+        try:
+            for telegram_id, days in writes.items():
+                await self.backend.invalidate(user_scope(telegram_id), _intervals(days))
+        except Exception as e:
+            logger.warning(f"Stats cache invalidation failed: {e}")
+
+    async def publish_clear(self, db: AsyncSession) -> None:
+        """Tell other processes to drop every cached range, delivered when db commits"""
+        await cache_bus.publish(db, "stats", None)
+
+    async def clear(self) -> None:
+        """Drop every cached range, pinned closed months included (after rewriting rollups)"""
+        if replica_router:
+            replica_router.clear()
+        if self.backend is None:
+            return
+        try:
+            await self.backend.clear_all()
+        except Exception as e:
+            logger.warning(f"Stats cache clear failed: {e}")
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+    def _clear_local(self) -> None:
+        if replica_router:
+            replica_router.clear()
+        if self._local_backend():
+            self.backend.clear()
+
+    def _on_remote_invalidation(self, payload) -> None:
+        if payload is None:
+            self._clear_local()
+            return
+        if replica_router:
+            replica_router.wrote(_scope_user(scope) for scope, _ in payload)
+        if not self._local_backend():
+            return
+        for scope, intervals in payload:
+            self.backend.discard(scope, [
+                (date.fromisoformat(low), date.fromisoformat(high)) for low, high in intervals
+            ])
+
+
+def _create_backend(settings):
+    if settings.STATS_CACHE_BACKEND == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("STATS_CACHE_BACKEND=redis requires REDIS_URL")
+        return RedisStatsBackend(settings.REDIS_URL, ttl=settings.STATS_CACHE_TTL)
+    if settings.STATS_CACHE_BACKEND == "memory":
+        return MemoryStatsBackend(
+            maxsize=settings.STATS_CACHE_SIZE,
+            pinned_maxsize=settings.STATS_CACHE_PINNED_SIZE,
+            ttl=settings.STATS_CACHE_TTL
+        )
+    return None
+
+
+stats_cache = StatsCache(_create_backend(get_settings()))
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete
+from app.config import get_settings
+from app.database import AsyncSessionLocal, dialect_insert
+from app.metrics import UPDATES_CHECKED, UPDATES_DUPLICATE
+from app.models.processed_update import ProcessedUpdate
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre limpiezas de processed_updates
+CLEANUP_INTERVAL = 3600.0
+
+
+class UpdateDeduplicator:
+    """Drops Telegram updates that were already received (redeliveries).
+
+    A bounded in-memory set answers repeats seen by this process without
+    any I/O. With persist=True, new update_ids are also claimed in
+    processed_updates, so a redelivery that lands on another worker or
+    after a restart is caught too; concurrent claims are written with one
+    multi-row INSERT. If the table can't be reached the update is
+    processed anyway: a rare duplicate beats a lost update.
+    """
+
+    def __init__(self, maxsize: int, persist: bool, ttl: float):
+        self.maxsize = max(1, maxsize)
+        self.persist = persist
+        self.ttl = ttl
+        self.checked = 0
+        self.duplicates = 0
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._flusher: asyncio.Task | None = None
+        self._cleanup_task: asyncio.Task | None = None
+
+    async def claim(self, update_id: int) -> bool:
+        """Return True the first time update_id is seen, False for a redelivery"""
+        self.checked += 1
+        UPDATES_CHECKED.inc()
+        if update_id in self._seen:
+            self.duplicates += 1
+            UPDATES_DUPLICATE.inc()
+            return False
+
+        self._seen[update_id] = None
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+        if not self.persist:
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[update_id] = future
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush())
+        if not await future:
+            self.duplicates += 1
+            UPDATES_DUPLICATE.inc()
+            return False
+        return True
+
+    async def _flush(self) -> None:
+        # Claims arriving while an INSERT is in flight go out together in the next one
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, {}
+                try:
+                    claimed = await self._insert(list(batch))
+                except Exception as e:
+                    logger.warning(f"Update dedup table unavailable, processing {len(batch)} updates: {e}")
+                    claimed = set(batch)
+                for update_id, future in batch.items():
+                    if not future.done():
+                        future.set_result(update_id in claimed)
+        finally:
+            self._flusher = None
+
+    async def _insert(self, update_ids: list[int]) -> set[int]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                dialect_insert(db)(ProcessedUpdate)
+                .values([{"update_id": update_id} for update_id in update_ids])
+                .on_conflict_do_nothing(index_elements=["update_id"])
+                .returning(ProcessedUpdate.update_id)
+            )
+            claimed = set(result.scalars().all())
+            await db.commit()
+        return claimed
+
+    async def cleanup(self) -> int:
+        """Delete claims older than the TTL; returns rows deleted"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(ProcessedUpdate).where(ProcessedUpdate.received_at < cutoff)
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def start(self) -> None:
+        """Prune old claims periodically in the background"""
+        if self.persist and self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop(), name="update-dedup-cleanup")
+
+    async def stop(self) -> None:
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            await asyncio.gather(self._cleanup_task, return_exceptions=True)
+            self._cleanup_task = None
+        if self._flusher is not None:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            try:
+                deleted = await self.cleanup()
+                if deleted:
+                    logger.info(f"Pruned {deleted} processed update ids")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Processed updates cleanup failed: {e}")
+            await asyncio.sleep(CLEANUP_INTERVAL)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._seen),
+            "maxsize": self.maxsize,
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "duplicate_rate": self.duplicates / self.checked if self.checked else 0.0
+        }
+
+
+_settings = get_settings()
+
+update_dedup = UpdateDeduplicator(
+    maxsize=_settings.UPDATE_DEDUP_SIZE,
+    persist=_settings.UPDATE_DEDUP == "db",
+    ttl=_settings.UPDATE_DEDUP_TTL
+) if _settings.UPDATE_DEDUP != "off" else None
@@ -1,14 +1,62 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, cast, literal, String
+from app.database import replica_router
 from app.models.user import User
+from app.services.cache_bus import cache_bus
+from app.services.identity_cache import identity_cache
+
+
+def _on_identity_change(telegram_id: int) -> None:
+    identity_cache.invalidate(telegram_id)
+    if replica_router:
+        # Registered on another process: the replica may not have the user yet
+        replica_router.wrote([telegram_id])
+
+
+cache_bus.register("identity", _on_identity_change, identity_cache.clear)
 
 
 async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int) -> User | None:
     """Get user by telegram ID"""
+    user_id = identity_cache.get(telegram_id)
+    if user_id is not None:
+        # Primary key lookup, free if already in the session identity map
+        user = await db.get(User, user_id)
+        if user is not None:
+            return user
+        identity_cache.invalidate(telegram_id)
+
     result = await db.execute(
         select(User).where(User.telegram_id == telegram_id)
     )
-    return result.scalar_one_or_none()
+    user = result.scalar_one_or_none()
+    if user:
+        identity_cache.set(telegram_id, user.id)
+    return user
+
+
+async def resolve_user_id(db: AsyncSession, telegram_id: int) -> int | None:
+    """Get the internal user ID for a telegram ID, skipping the query on a cache hit"""
+    user_id = identity_cache.get(telegram_id)
+    if user_id is not None:
+        return user_id
+
+    result = await db.execute(
+        select(User.id).where(User.telegram_id == telegram_id)
+    )
+    user_id = result.scalar_one_or_none()
+    if user_id is not None:
+        identity_cache.set(telegram_id, user_id)
+    return user_id
+
+
+def display_name():
+    """SQL expression for a user's display name (first name, username or 'User <id>')"""
+    return func.coalesce(
+        User.first_name,
+        User.username,
+        literal("User ") + cast(User.id, String)
+    )
 
 
 async def get_user_by_id(db: AsyncSession, user_id: int) -> User | None:
@@ -48,9 +96,13 @@ async def create_or_update_user(
             last_name=last_name
         )
         db.add(user)
+        # Other processes may still map this telegram_id to a deleted user
+        await cache_bus.publish(db, "identity", telegram_id)
         await db.commit()
         await db.refresh(user)
+        if replica_router:
+            replica_router.wrote([telegram_id])
 
+    identity_cache.invalidate(telegram_id)
+    identity_cache.set(telegram_id, user.id)
     return user
-
-
@@ -0,0 +1,110 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+
+LB_TO_KG = 0.45359237
+
+# Una descripción se separa en ejercicios por comas (no decimales), ';', '+' o saltos de línea
+_SEPARATORS = re.compile(r"(?<!\d),|,(?!\d)|[;\n+]")
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+_UNIT = r"(kgs?|kilos?|lbs?|libras?)"
+_DURATION = re.compile(rf"{_NUMBER}\s*(h|hrs?|horas?|min|mins|minutos?)\b", re.IGNORECASE)
+# 3x10, 3x10x80, 3 x 10 @ 80kg
+_SETS_REPS = re.compile(
+    rf"(\d+)\s*[x×]\s*(\d+)(?:\s*[x×@]\s*{_NUMBER}\s*{_UNIT}?\b)?",
+    re.IGNORECASE
+)
+# 3 series de 10, 4 sets of 8
+_SETS_OF_REPS = re.compile(
+    r"(\d+)\s*(?:series|sets)\s*(?:de|of|x)\s*(\d+)\s*(?:reps?|repeticiones)?",
+    re.IGNORECASE
+)
+# 80kg, 80 kg, @80, @ 80 lbs
+_WEIGHT = re.compile(rf"@\s*{_NUMBER}\s*{_UNIT}?\b|{_NUMBER}\s*{_UNIT}\b", re.IGNORECASE)
+
+
+@dataclass
+class ParsedLift:
+    name: str  # Clave normalizada del catálogo
+    display_name: str
+    sets: int | None = None
+    reps: int | None = None
+    weight: float | None = None  # kg
+    duration_minutes: float | None = None
+
+
+def normalize_lift_name(name: str) -> str:
+    """Catalog key for a lift name: lowercase, no accents, single spaces"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", name.lower()).split())[:100]
+
+
+def _number(value: str) -> float:
+    return float(value.replace(",", "."))
+
+
+def _kilograms(value: str, unit: str | None) -> float:
+    weight = _number(value)
+    if unit and unit.lower().startswith(("lb", "libra")):
+        weight *= LB_TO_KG
+    return round(weight, 2)
+
+
+def _parse_item(text: str) -> ParsedLift | None:
+    lift = ParsedLift(name="", display_name="")
+    spans: list[tuple[int, int]] = []
+
+    def taken(match: re.Match) -> bool:
+        return any(start < match.end() and match.start() < end for start, end in spans)
+
+    for match in _DURATION.finditer(text):
+        minutes = _number(match.group(1))
+        if match.group(2).lower().startswith("h"):
+            minutes *= 60
+        lift.duration_minutes = minutes
+        spans.append(match.span())
+        break
+
+    match = _SETS_REPS.search(text) or _SETS_OF_REPS.search(text)
+    if match and not taken(match):
+        lift.sets, lift.reps = int(match.group(1)), int(match.group(2))
+        if match.re is _SETS_REPS and match.group(3):
+            lift.weight = _kilograms(match.group(3), match.group(4))
+        spans.append(match.span())
+
+    if lift.weight is None:
+        for match in _WEIGHT.finditer(text):
+            if taken(match):
+                continue
+            value, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+            lift.weight = _kilograms(value, unit)
+            spans.append(match.span())
+            break
+
+    if not spans:
+        return None  # Sin series, peso ni duración: texto libre
+
+    name = text
+    for start, end in sorted(spans, reverse=True):
+        name = name[:start] + " " + name[end:]
+    display_name = " ".join(name.split()).strip(" -:()")[:100]
+    lift.name = normalize_lift_name(display_name)
+    if not lift.name:
+        return None
+    lift.display_name = display_name
+    return lift
+
+
+def parse_workout(description: str) -> list[ParsedLift]:
+    """Extract lifts with sets, reps, weight (kg) and duration from a free-text description.
+
+    Example: "Bench press 3x10 80kg, Cardio 20min" -> bench press 3x10 @ 80 kg and
+    cardio 20 min. Items without any numbers are ignored.
+    """
+    lifts = []
+    for item in _SEPARATORS.split(description):
+        lift = _parse_item(item.strip())
+        if lift is not None:
+            lifts.append(lift)
+    return lifts
@@ -0,0 +1,236 @@
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable
+from sqlalchemy import select, insert, delete, exists, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import dialect_insert
+from app.models.exercise import Exercise
+from app.models.exercise_set import ExerciseSet
+from app.models.lift import Lift
+from app.services.user_service import resolve_user_id
+from app.services.workout_parser import parse_workout, normalize_lift_name
+
+# Cache nombre normalizado -> lift_id (solo ids ya confirmados en la base de datos)
+_LIFT_IDS_MAX = 10_000
+_lift_ids: OrderedDict[str, int] = OrderedDict()
+
+
+async def _resolve_lift_ids(db: AsyncSession, names: dict[str, str]) -> dict[str, int]:
+    """Map catalog names to ids, adding unknown names to the catalog"""
+    ids = {name: _lift_ids[name] for name in names if name in _lift_ids}
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids
+
+    created = await db.execute(
+        dialect_insert(db)(Lift)
+        .values([{"name": name, "display_name": names[name]} for name in missing])
+        .on_conflict_do_nothing(index_elements=["name"])
+        .returning(Lift.name, Lift.id)
+    )
+    new_ids = dict(created.all())
+    ids.update(new_ids)
+
+    existing = [name for name in missing if name not in new_ids]
+    if existing:
+        rows = await db.execute(select(Lift.name, Lift.id).where(Lift.name.in_(existing)))
+        for name, lift_id in rows.all():
+            ids[name] = lift_id
+            # Only cache committed rows: a rollback could discard the new ones
+            _lift_ids[name] = lift_id
+            if len(_lift_ids) > _LIFT_IDS_MAX:
+                _lift_ids.popitem(last=False)
+    return ids
+
+
+async def record_sets(db: AsyncSession, exercises: Iterable[tuple[int, int, date, str]]) -> int:
+    """Parse (exercise_id, user_id, day, description) rows and insert their sets, without committing"""
+    parsed = [
+        (exercise_id, user_id, day, lift)
+        for exercise_id, user_id, day, description in exercises
+        for lift in parse_workout(description)
+    ]
+    if not parsed:
+        return 0
+
+    lift_ids = await _resolve_lift_ids(db, {lift.name: lift.display_name for *_, lift in parsed})
+    await db.execute(insert(ExerciseSet), [
+        {
+            "exercise_id": exercise_id,
+            "user_id": user_id,
+            "lift_id": lift_ids[lift.name],
+            "day": day,
+            "sets": lift.sets,
+            "reps": lift.reps,
+            "weight": lift.weight,
+            "duration_minutes": lift.duration_minutes
+        }
+        for exercise_id, user_id, day, lift in parsed
+    ])
+    return len(parsed)
+
+
+def _unparsed_exercises():
+    return (
+        select(Exercise.id, Exercise.user_id, Exercise.day, Exercise.description)
+        .where(~exists().where(ExerciseSet.exercise_id == Exercise.id))
+        .order_by(Exercise.id)
+    )
+
+
+async def record_new_sets(db: AsyncSession, user_id: int, after_id: int) -> int:
+    """Parse a user's exercises with id > after_id that have no sets yet (used after bulk loads).
+
+    Returns the highest id scanned (after_id if none), the after_id for the next load.
+    """
+    rows = (await db.execute(
+        _unparsed_exercises()
+        .where(Exercise.user_id == user_id)
+        .where(Exercise.id > after_id)
+    )).all()
+    await record_sets(db, rows)
+    return max((row.id for row in rows), default=after_id)
+
+
+async def backfill_sets(
+    db: AsyncSession,
+    user_id: int | None = None,
+    batch_size: int = 1000,
+    reparse: bool = False
+) -> tuple[int, int]:
+    """Parse stored exercises into sets in id order, one transaction per batch.
+
+    Exercises that already have sets are skipped, so an interrupted run can be
+    resumed. With reparse=True existing sets are replaced (after parser changes).
+    Returns (exercises scanned, sets inserted).
+    """
+    last_id = 0
+    scanned = inserted = 0
+    while True:
+        if reparse:
+            query = (
+                select(Exercise.id, Exercise.user_id, Exercise.day, Exercise.description)
+                .order_by(Exercise.id)
+            )
+        else:
+            query = _unparsed_exercises()
+        query = query.where(Exercise.id > last_id).limit(batch_size)
+        if user_id is not None:
+            query = query.where(Exercise.user_id == user_id)
+
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+
+        if reparse:
+            await db.execute(
+                delete(ExerciseSet).where(ExerciseSet.exercise_id.in_([row.id for row in rows]))
+            )
+        inserted += await record_sets(db, rows)
+        await db.commit()
+
+        last_id = rows[-1].id
+        scanned += len(rows)
+    return scanned, inserted
+
+
+async def find_lifts(db: AsyncSession, telegram_id: int, name: str) -> list[Lift]:
+    """Find the user's lifts matching a name: exact catalog match, else by prefix"""
+    user_id = await resolve_user_id(db, telegram_id)
+    key = normalize_lift_name(name)
+    if user_id is None or not key:
+        return []
+
+    used = exists().where(ExerciseSet.lift_id == Lift.id).where(ExerciseSet.user_id == user_id)
+    result = await db.execute(select(Lift).where(Lift.name == key).where(used))
+    lift = result.scalar_one_or_none()
+    if lift is not None:
+        return [lift]
+
+    escaped = key.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    result = await db.execute(
+        select(Lift)
+        .where(Lift.name.like(f"{escaped}%", escape="\\"))
+        .where(used)
+        .order_by(Lift.name)
+        .limit(10)
+    )
+    return list(result.scalars().all())
+
+
+async def get_user_lifts(db: AsyncSession, telegram_id: int) -> list[str]:
+    """Names of the lifts a user has logged"""
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        return []
+    result = await db.execute(
+        select(Lift.display_name)
+        .where(exists().where(ExerciseSet.lift_id == Lift.id).where(ExerciseSet.user_id == user_id))
+        .order_by(Lift.name)
+    )
+    return list(result.scalars().all())
+
+
+async def get_personal_records(db: AsyncSession, telegram_id: int) -> list:
+    """Best set per lift (heaviest, then most reps, then longest), with the day it was done"""
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        return []
+
+    ranked = (
+        select(
+            ExerciseSet.lift_id,
+            ExerciseSet.sets,
+            ExerciseSet.reps,
+            ExerciseSet.weight,
+            ExerciseSet.duration_minutes,
+            ExerciseSet.day,
+            func.row_number().over(
+                partition_by=ExerciseSet.lift_id,
+                order_by=(
+                    ExerciseSet.weight.desc().nulls_last(),
+                    ExerciseSet.reps.desc().nulls_last(),
+                    ExerciseSet.duration_minutes.desc().nulls_last(),
+                    ExerciseSet.day
+                )
+            ).label("rank")
+        )
+        .where(ExerciseSet.user_id == user_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            Lift.display_name.label("name"),
+            ranked.c.sets,
+            ranked.c.reps,
+            ranked.c.weight,
+            ranked.c.duration_minutes,
+            ranked.c.day
+        )
+        .join(Lift, Lift.id == ranked.c.lift_id)
+        .where(ranked.c.rank == 1)
+        .order_by(Lift.name)
+    )
+    return list(result.all())
+
+
+async def get_progress(db: AsyncSession, telegram_id: int, lift_id: int, limit: int = 20) -> list:
+    """Latest sets of one lift, oldest first"""
+    user_id = await resolve_user_id(db, telegram_id)
+    if user_id is None:
+        return []
+
+    result = await db.execute(
+        select(
+            ExerciseSet.day,
+            ExerciseSet.sets,
+            ExerciseSet.reps,
+            ExerciseSet.weight,
+            ExerciseSet.duration_minutes
+        )
+        .where(ExerciseSet.user_id == user_id)
+        .where(ExerciseSet.lift_id == lift_id)
+        .order_by(ExerciseSet.day.desc(), ExerciseSet.id.desc())
+        .limit(limit)
+    )
+    return list(reversed(result.all()))
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from sqlalchemy import select, insert
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.exercise import Exercise
+from app.models.user import User
+from app.services import exercise_service, workout_service
+from app.services.identity_cache import identity_cache
+from app.services.stats_cache import stats_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingWrite:
+    telegram_id: int
+    day: date
+    description: str
+    future: asyncio.Future = field(repr=False)
+
+
+class ExerciseWriteBatcher:
+    """Group-commit batcher for exercise inserts.
+
+    Concurrent add() calls are collected for up to max_delay seconds (or
+    max_size rows) and written with one multi-row INSERT, one rollup upsert
+    and one COMMIT. Each caller gets back its own row and the days trained
+    in its month. If the batch fails before committing, rows are retried
+    one by one so only the offending caller receives the error; a committed
+    batch is never written again.
+    """
+
+    def __init__(self, max_delay: float, max_size: int):
+        self.max_delay = max_delay
+        self.max_size = max(1, max_size)
+        self._pending: list[_PendingWrite] = []
+        self._timer: asyncio.Task | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    async def add(self, telegram_id: int, day: date, description: str) -> tuple[Exercise, int]:
+        """Queue an exercise insert and wait for it to be committed"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingWrite(telegram_id, day, description, future))
+
+        if len(self._pending) >= self.max_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+        return await future
+
+    async def flush(self) -> None:
+        """Write pending rows now and wait for in-flight batches"""
+        if self._pending:
+            self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        if self._pending:
+            self._start_flush()
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: list[_PendingWrite]) -> None:
+        committed = False
+        try:
+            async with AsyncSessionLocal() as db:
+                results, written = await self._write_batch(db, batch)
+                await db.commit()
+                committed = True
+            await stats_cache.invalidate(written)
+        except Exception as e:
+            if not committed:
+                logger.warning(f"Batch insert of {len(batch)} exercises failed, retrying one by one: {e}")
+                await self._write_each(batch)
+                return
+            # The rows are already saved: retrying would insert them (and bump the rollups) twice
+            logger.error(f"Batch of {len(batch)} exercises committed, but a later step failed: {e}")
+
+        for item, result in zip(batch, results):
+            if item.future.done():
+                continue
+            if isinstance(result, Exception):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+
+    async def _write_batch(self, db, batch: list[_PendingWrite]) -> tuple[list, dict[int, list[date]]]:
+        """Stage the batch in db without committing; returns each caller's result and the days written"""
+        # Resolve users: cache first, then one query for all misses
+        user_ids = {item.telegram_id: identity_cache.get(item.telegram_id) for item in batch}
+        missing = [telegram_id for telegram_id, user_id in user_ids.items() if user_id is None]
+        if missing:
+            rows = await db.execute(
+                select(User.telegram_id, User.id).where(User.telegram_id.in_(missing))
+            )
+            for telegram_id, user_id in rows.all():
+                user_ids[telegram_id] = user_id
+                identity_cache.set(telegram_id, user_id)
+
+        valid = [item for item in batch if user_ids[item.telegram_id] is not None]
+        results: dict[int, object] = {
+            id(item): ValueError(f"User with telegram_id {item.telegram_id} not found")
+            for item in batch if user_ids[item.telegram_id] is None
+        }
+        written = defaultdict(list)
+
+        if valid:
+            inserted = await db.execute(
+                insert(Exercise).returning(
+                    Exercise.id, Exercise.created_at, sort_by_parameter_order=True
+                ),
+                [
+                    {
+                        "user_id": user_ids[item.telegram_id],
+                        "day": item.day,
+                        "description": item.description
+                    }
+                    for item in valid
+                ]
+            )
+            rows = inserted.all()
+
+            # One rollup upsert for every (user, month) touched by the batch
+            increments = Counter(
+                (user_ids[item.telegram_id], item.day.replace(day=1)) for item in valid
+            )
+            day_masks = defaultdict(int)
+            for item in valid:
+                day_masks[(user_ids[item.telegram_id], item.day.replace(day=1))] |= (
+                    exercise_service.day_bit(item.day)
+                )
+            final_counts = await exercise_service.add_monthly_counts(db, increments, day_masks)
+            await workout_service.record_sets(db, [
+                (row.id, user_ids[item.telegram_id], item.day, item.description)
+                for item, row in zip(valid, rows)
+            ])
+            for item in valid:
+                written[item.telegram_id].append(item.day)
+            await stats_cache.publish(db, written)
+
+            for item, row in zip(valid, rows):
+                user_id = user_ids[item.telegram_id]
+                exercise = Exercise(
+                    id=row.id,
+                    user_id=user_id,
+                    day=item.day,
+                    description=item.description,
+                    created_at=row.created_at
+                )
+                results[id(item)] = (exercise, final_counts[(user_id, item.day.replace(day=1))])
+
+        return [results[id(item)] for item in batch], written
+
+    async def _write_each(self, batch: list[_PendingWrite]) -> None:
+        for item in batch:
+            if item.future.done():
+                continue
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await exercise_service.add_exercise_and_count(
+                        db=db,
+                        telegram_id=item.telegram_id,
+                        day=item.day,
+                        description=item.description
+                    )
+                item.future.set_result(result)
+            except Exception as e:
+                item.future.set_exception(e)
+
+
+_settings = get_settings()
+
+exercise_batcher = ExerciseWriteBatcher(
+    max_delay=_settings.WRITE_BATCH_MAX_DELAY_MS / 1000,
+    max_size=_settings.WRITE_BATCH_MAX_SIZE
+) if _settings.WRITE_BATCH_ENABLED else None
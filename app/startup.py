@@ -0,0 +1,79 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable
+from app.metrics import STARTUP_PHASE_SECONDS, WORKER_READY
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTracker:
+    """Times startup phases and tracks readiness (GET /ready).
+
+    Phases are timed from the moment they start; background phases that
+    don't block serving (e.g. webhook registration) are listed as pending
+    until they finish. The app is ready once mark_ready() is called and
+    stops being ready when shutdown begins.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.pending: set[str] = set()
+        self.failed: dict[str, str] = {}
+        self.ready = False
+        self.stopping = False
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = round(seconds, 4)
+        STARTUP_PHASE_SECONDS.labels(phase=name).set(seconds)
+        logger.info(f"Startup phase '{name}' took {seconds * 1000:.0f} ms")
+
+    @asynccontextmanager
+    async def phase(self, name: str):
+        """Time a block as a startup phase"""
+        start = time.perf_counter()
+        self.pending.add(name)
+        try:
+            yield
+        except Exception as e:
+            self.failed[name] = str(e)
+            raise
+        finally:
+            self.pending.discard(name)
+            self.record(name, time.perf_counter() - start)
+
+    async def run(self, name: str, awaitable: Awaitable, required: bool = True):
+        """Await a startup phase; failures of optional phases are logged, not raised"""
+        try:
+            async with self.phase(name):
+                return await awaitable
+        except Exception as e:
+            if required:
+                raise
+            logger.error(f"Startup phase '{name}' failed: {e}")
+
+    def mark_ready(self, started: float) -> None:
+        """Record the time since started (perf_counter) as 'total' and accept traffic"""
+        self.record("total", time.perf_counter() - started)
+        self.ready = True
+        WORKER_READY.set(1)
+
+    def mark_stopping(self) -> None:
+        self.ready = False
+        self.stopping = True
+        WORKER_READY.set(0)
+
+    def status(self) -> dict:
+        if self.stopping:
+            state = "stopping"
+        else:
+            state = "ready" if self.ready else "starting"
+        return {
+            "status": state,
+            "phases": self.phases,
+            "pending": sorted(self.pending),
+            "failed": self.failed
+        }
+
+
+startup = StartupTracker()
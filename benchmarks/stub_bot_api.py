@@ -0,0 +1,102 @@
+"""Minimal local stand-in for the Telegram Bot API.
+
+Answers every ``/bot<token>/<method>`` call with a successful response so the
+bot can run end to end without reaching Telegram. Runs uvicorn in a
+background thread so it does not share the event loop under test.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qsl
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "GymBot", "username": "gymbot_stub_bot"}
+
+
+class StubBotAPI:
+    """Stub Bot API server counting calls per method"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self.webhook_url = ""
+        self._message_id = 0
+        self._lock = threading.Lock()
+        self._server: uvicorn.Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """Value for TELEGRAM_API_BASE_URL (the token is appended by the bot)"""
+        return f"http://{self.host}:{self.port}/bot"
+
+    def start(self) -> None:
+        app = Starlette(routes=[
+            Route("/bot{token}/{method}", self._handle, methods=["GET", "POST"])
+        ])
+        config = uvicorn.Config(app, host=self.host, port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    async def _handle(self, request: Request) -> JSONResponse:
+        method = request.path_params["method"]
+        params = await self._params(request)
+        with self._lock:
+            self.calls[method] += 1
+            self._message_id += 1
+            message_id = self._message_id
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return JSONResponse({"ok": True, "result": self._result(method, params, message_id)})
+
+    async def _params(self, request: Request) -> dict:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            return await request.json()
+        # PTB posts url-encoded forms with JSON-encoded values
+        body = (await request.body()).decode()
+        params = {}
+        for key, value in parse_qsl(body):
+            try:
+                params[key] = json.loads(value)
+            except (TypeError, ValueError):
+                params[key] = value
+        return params
+
+    def _result(self, method: str, params: dict, message_id: int):
+        if method == "getMe":
+            return BOT_USER
+        if method == "getWebhookInfo":
+            return {"url": self.webhook_url, "has_custom_certificate": False, "pending_update_count": 0}
+        if method == "setWebhook":
+            self.webhook_url = params.get("url", "")
+        if method in ("sendMessage", "editMessageText"):
+            return {
+                "message_id": params.get("message_id", message_id),
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id", 0), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", "")
+            }
+        return True
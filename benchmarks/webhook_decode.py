@@ -0,0 +1,110 @@
+"""Microbenchmark of the webhook decoding path.
+
+Compares, per update type, the time spent turning a request body into
+something process_update can use and rendering the response:
+
+- before: json.loads + Update.de_json + JSONResponse of {"ok": True}
+  for every update (what the webhook did originally).
+- after: orjson (when installed) + UpdateFilter on the raw dict;
+  Update.de_json only for updates a handler would act on, and a
+  pre-serialized response body.
+
+No database, Bot API or handler work is included.
+
+Usage:
+    python -m benchmarks.webhook_decode
+    python -m benchmarks.webhook_decode --number 20000
+"""
+import argparse
+import json
+import os
+import time
+import timeit
+
+# Module-level settings need these to import app.bot
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:BENCHMARK")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./benchmark.db")
+
+USER = {"id": 10_001, "is_bot": False, "first_name": "User", "username": "user", "language_code": "es"}
+PRIVATE = {"id": 10_001, "type": "private", "first_name": "User", "username": "user"}
+GROUP = {"id": -100_001, "type": "supergroup", "title": "Gym"}
+
+
+def message(chat: dict, text: str, command: bool = False) -> dict:
+    payload = {"message_id": 42, "date": int(time.time()), "chat": chat, "from": USER, "text": text}
+    if command:
+        payload["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return payload
+
+
+# (name, update) pairs; update_id is added when encoding
+UPDATES = [
+    ("command", {"message": message(PRIVATE, "/add Bench press 3x10, Cardio 20min", command=True)}),
+    ("callback", {"callback_query": {
+        "id": "1", "from": USER, "chat_instance": "1", "data": "hist:10001:2024-01-31:99",
+        "message": message(PRIVATE, "📜 Historial")
+    }}),
+    ("group_chatter", {"message": message(GROUP, "¿Alguien va al gimnasio hoy en la tarde?")}),
+    ("edited_message", {"edited_message": dict(message(PRIVATE, "Leg day 4x12"), edit_date=int(time.time()))}),
+    ("reaction", {"message_reaction": {
+        "chat": GROUP, "message_id": 42, "user": USER, "date": int(time.time()),
+        "old_reaction": [], "new_reaction": [{"type": "emoji", "emoji": "👍"}]
+    }}),
+    ("my_chat_member", {"my_chat_member": {
+        "chat": GROUP, "from": USER, "date": int(time.time()),
+        "old_chat_member": {"status": "left", "user": {"id": 1, "is_bot": True, "first_name": "GymBot"}},
+        "new_chat_member": {"status": "member", "user": {"id": 1, "is_bot": True, "first_name": "GymBot"}}
+    }}),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=10000, help="Iterations per update type")
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, Response
+    from telegram import Bot, Update
+    from app.bot.webhook import WEBHOOK_OK_BODY, UpdateFilter, json_loads
+    from app.services import chat_service
+
+    bot = Bot(os.environ["TELEGRAM_BOT_TOKEN"])
+    update_filter = UpdateFilter(
+        commands=["start", "add", "stats"],
+        callback_prefixes=["hist:", "srch:"],
+        document_extensions=["csv", "json", "jsonl"]
+    )
+    update_filter.username = "thegymcounterbot"
+    # The group member is already recorded, as after their first message
+    chat_service._remember(GROUP["id"], USER["id"])
+
+    def before(body: bytes) -> None:
+        data = json.loads(body)
+        Update.de_json(data, bot)
+        JSONResponse(jsonable_encoder({"ok": True}))
+
+    def after(body: bytes) -> None:
+        data = json_loads(body)
+        if update_filter.relevant(data):
+            Update.de_json(data, bot)
+        Response(WEBHOOK_OK_BODY, media_type="application/json")
+
+    print(f"JSON decoder: {json_loads.__module__}")
+    print(f"{'update':<16}{'before (µs)':>12}{'after (µs)':>12}{'speedup':>9}  handled")
+    totals = [0.0, 0.0]
+    for update_id, (name, update) in enumerate(UPDATES, start=1):
+        body = json.dumps(dict(update, update_id=update_id)).encode()
+        timings = [
+            min(timeit.repeat(lambda: path(body), number=args.number, repeat=3)) / args.number * 1e6
+            for path in (before, after)
+        ]
+        totals = [total + timing for total, timing in zip(totals, timings)]
+        handled = "yes" if update_filter.relevant(json_loads(body)) else "no"
+        print(f"{name:<16}{timings[0]:>12.1f}{timings[1]:>12.1f}{timings[0] / timings[1]:>8.1f}x  {handled}")
+    print(f"{'mean':<16}{totals[0] / len(UPDATES):>12.1f}{totals[1] / len(UPDATES):>12.1f}"
+          f"{totals[0] / totals[1]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,23 @@
 #!/bin/bash
 set -e
 
-echo "Waiting for PostgreSQL to be ready..."
-until pg_isready -h db -U gymbot; do
-  sleep 1
-done
-
-# Crear directorio de versiones si no existe
-mkdir -p alembic/versions
-
-# Verificar si existe alguna migración
-if [ -z "$(find alembic/versions -name '*.py' -type f 2>/dev/null)" ]; then
-    echo "No migrations found. Creating initial migration..."
-    alembic revision --autogenerate -m "Initial tables"
+# Las migraciones vienen en la imagen (alembic/versions) y nunca se generan al arrancar.
+# La espera a PostgreSQL la hace docker-compose (depends_on: service_healthy).
+#   MIGRATIONS=upgrade  aplica las migraciones pendientes antes de iniciar (por defecto)
+#   MIGRATIONS=check    no lanza alembic: la app verifica al iniciar que la base está al día
+#   MIGRATIONS=off      no hace nada
+if [ "${MIGRATIONS:-upgrade}" = "upgrade" ]; then
+    echo "Running database migrations..."
+    alembic upgrade head
 fi
 
-echo "Running database migrations..."
-alembic upgrade head
+# Con varios workers las métricas de Prometheus se escriben por proceso en este directorio
+# y /metrics las suma; se vacía en cada arranque (no debe compartirse entre contenedores)
+if [ "${WORKERS:-1}" -gt 1 ]; then
+    export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/gymbot-metrics}"
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
 
-echo "Starting FastAPI application..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+echo "Starting FastAPI application with ${WORKERS:-1} worker(s)..."
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers "${WORKERS:-1}"